@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from threading import local
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.http import FileResponse
+
+from api.constants import CPU_POOL_SIZE
+
+cpu_executor = ThreadPoolExecutor(
+    max_workers=CPU_POOL_SIZE, thread_name_prefix='cpu')
+handler_state = local()
+
+
+def run_cpu_bound(func, *args, **kwargs):
+    """Выполняет тяжёлую для процессора работу (reportlab, Pillow).
+
+    В пул из CPU_POOL_SIZE потоков работа уходит только внутри
+    запроса ThreadedASGIHandler (развёртывание с воркерами uvicorn,
+    см. gunicorn.conf.py): там число потоков запросов не ограничено.
+    В WSGI-воркерах, командах и тестах функция вызывается напрямую
+    в текущем потоке. Функция не должна обращаться к БД: соединения
+    пула потоков никто не закрывает.
+    """
+
+    if not getattr(handler_state, 'asgi', False):
+        return func(*args, **kwargs)
+    return cpu_executor.submit(func, *args, **kwargs).result()
+
+
+def database_sync_to_async(func):
+    """sync_to_async для кода с запросами к БД.
+
+    В Django 3.2 sync_to_async(thread_sensitive=True) выполняет весь
+    синхронный код ASGI-приложения в одном общем потоке, поэтому
+    функция запускается в пуле потоков цикла событий. Устаревшие
+    соединения этого потока закрываются до и после вызова, как
+    в начале и конце обычного запроса.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(wrapper, thread_sensitive=False)
+
+
+class ThreadedASGIHandler(ASGIHandler):
+    """ASGI-обработчик, выполняющий каждый запрос в отдельном потоке.
+
+    Стандартный обработчик Django 3.2 переключается в общий поток
+    на каждом синхронном middleware и выполняет там же синхронные
+    представления, то есть все запросы по очереди. DRF 3.14
+    не поддерживает асинхронные представления, поэтому цепочка
+    middleware и представление целиком выполняются через
+    database_sync_to_async, а цикл событий принимает тело запроса
+    и отдаёт ответ, не занимая поток.
+    """
+
+    def load_middleware(self, is_async=False):
+        super().load_middleware(is_async=False)
+
+    async def get_response_async(self, request):
+        return await database_sync_to_async(self.get_response_in_thread)(
+            request)
+
+    def get_response_in_thread(self, request):
+        """Ответ на запрос. Потоковые ответы, кроме файлов, собираются
+           целиком: их читает цикл событий, где запросы к БД запрещены.
+        """
+
+        handler_state.asgi = True
+        try:
+            response = self.get_response(request)
+        finally:
+            handler_state.asgi = False
+        if response.streaming and not isinstance(response, FileResponse):
+            response.streaming_content = list(response.streaming_content)
+        return response
+
+
+def get_asgi_application():
+    """Аналог django.core.asgi.get_asgi_application
+       с ThreadedASGIHandler.
+    """
+
+    django.setup(set_prefix=False)
+    return ThreadedASGIHandler()
@@ -0,0 +1,135 @@
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from api.cache import bump_version, get_version
+from api.constants import TOKEN_CACHE_SIZE, TOKEN_CACHE_TIMEOUT
+
+TOKEN_KEY = 'auth-token:{}'
+TOKEN_NAMESPACE = 'auth-tokens'
+
+# Счётчики меняются через UPDATE без сигналов, поэтому в кешируемом
+# пользователе они отложены: иначе user.save() (смена пароля в djoser)
+# перезаписал бы их устаревшими значениями.
+DEFERRED_USER_FIELDS = ('user__recipes_count', 'user__followers_count')
+
+
+class LRUCache:
+    """Кеш в памяти процесса с ограниченным размером
+       и временем жизни записей.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (value, time.monotonic() + self.timeout)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+token_cache = LRUCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TIMEOUT)
+
+
+def get_digest(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def drop_token(digest):
+    token_cache.delete(digest)
+    if settings.CACHE_IS_SHARED:
+        cache.delete(TOKEN_KEY.format(digest))
+        bump_version(TOKEN_NAMESPACE)
+
+
+def invalidate_token(key):
+    """Убирает токен из кеша процесса и общего кеша после фиксации
+       транзакции: иначе параллельный запрос успел бы закешировать
+       токен заново до того, как удаление станет видно в БД.
+
+    Другие процессы узнают об этом по новой версии пространства имён.
+    """
+
+    transaction.on_commit(partial(drop_token, get_digest(key)))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешированием пользователя.
+
+    Пара (пользователь, токен) хранится в LRU-кеше процесса не дольше
+    TOKEN_CACHE_TIMEOUT секунд. С общим для воркеров кешем
+    (CACHE_IS_SHARED) она хранится и там, а запись процесса действительна,
+    пока не изменилась версия токенов; без него удаление токена в другом
+    процессе станет заметно здесь по истечении TTL. Каждый запрос
+    получает свою копию пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = get_digest(key)
+        shared = settings.CACHE_IS_SHARED
+        version = get_version(TOKEN_NAMESPACE)[0] if shared else None
+
+        entry = token_cache.get(digest)
+        if entry is None or entry[2] != version:
+            if shared:
+                entry = self.get_shared_token(key, digest)
+            else:
+                entry = self.get_token(key)
+            token_cache.set(digest, (*entry, version))
+        user, token = entry[:2]
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return copy.copy(user), token
+
+    def get_shared_token(self, key, digest):
+        entry = cache.get(TOKEN_KEY.format(digest))
+        if entry is None:
+            entry = self.get_token(key)
+            cache.set(TOKEN_KEY.format(digest), entry, TOKEN_CACHE_TIMEOUT)
+        return entry
+
+    def get_token(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user').defer(
+                *DEFERRED_USER_FIELDS).get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return token.user, token
@@ -0,0 +1,200 @@
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from api.constants import RESPONSE_CACHE_TIMEOUT, USER_IDS_CACHE_TIMEOUT
+from recipes.models import Favorite, ShoppingList, Tag
+from users.models import Follow
+
+VERSION_KEY = 'response-version:{}'
+RESPONSE_KEY = 'response:{}:{}:{}'
+TAG_MAP_KEY = 'tag-map:{}'
+TAGS_KEY = 'tags:{}'
+RECIPE_KEY = 'recipe:{}:{}'
+USER_IDS_KEY = 'user-ids:{}:{}'
+
+# Для каждой модели списка пользователя - поле с id объекта.
+USER_ID_FIELDS = {
+    Favorite: 'recipe_id',
+    ShoppingList: 'recipe_id',
+    Follow: 'author_id',
+}
+
+
+def make_version():
+    return (f'{time.time_ns():x}', int(time.time()))
+
+
+def get_version(namespace):
+    """Версия данных пространства имён и время её последнего изменения."""
+
+    key = VERSION_KEY.format(namespace)
+    version = cache.get(key)
+    if version is None:
+        # add, а не set: процессы, одновременно не нашедшие версию
+        # в общем кеше, получат одну и ту же.
+        version = make_version()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(namespace):
+    """Помечает закешированные ответы пространства имён устаревшими."""
+
+    version = make_version()
+    cache.set(VERSION_KEY.format(namespace), version, None)
+    return version
+
+
+def get_versioned(namespace, key, build):
+    """Результат build(), закешированный до смены версии пространства
+       имён. Кеш используется и в памяти процесса, если воркер один;
+       вычисляется каждый раз, только если кеш не общий для воркеров
+       (CACHE_IS_SHARED): версию, увеличенную в другом процессе,
+       этот процесс не увидит.
+    """
+
+    if not settings.CACHE_IS_SHARED:
+        return build()
+    key = key.format(get_version(namespace)[0])
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+def get_tag_map():
+    """Словарь {slug: id} всех тегов, кешируется до изменения тегов."""
+
+    return get_versioned('tags', TAG_MAP_KEY, lambda: dict(
+        Tag.objects.values_list('slug', 'id')))
+
+
+def get_tags():
+    """Словарь {id: представление тега} всех тегов, кешируется
+       до изменения тегов.
+    """
+
+    return get_versioned('tags', TAGS_KEY, lambda: {
+        tag['id']: tag
+        for tag in Tag.objects.values('id', 'name', 'color', 'slug')
+    })
+
+
+def get_recipe_keys(recipe_ids):
+    """Ключи общего представления рецептов: {id: ключ}.
+       Версия 'recipes' увеличивается при изменении тегов
+       и ингредиентов.
+    """
+
+    version = get_version('recipes')[0]
+    return {pk: RECIPE_KEY.format(version, pk) for pk in recipe_ids}
+
+
+def invalidate_recipe(recipe_id):
+    """Удаляет общее представление рецепта после фиксации
+       транзакции, когда теги и ингредиенты уже сохранены.
+    """
+
+    if settings.CACHE_IS_SHARED:
+        transaction.on_commit(
+            lambda: cache.delete(get_recipe_keys([recipe_id])[recipe_id]))
+
+
+def load_user_ids(model, user_id):
+    return frozenset(model.objects.filter(
+        user_id=user_id).order_by().values_list(USER_ID_FIELDS[model],
+                                                flat=True))
+
+
+def get_user_ids(user_id, *models):
+    """Множества id из списков пользователя (избранное, список
+       покупок, подписки) в порядке моделей. Кешируются до изменения
+       строк списка, в том числе в памяти единственного воркера;
+       читаются из БД, только если кеш не общий для воркеров
+       (CACHE_IS_SHARED).
+    """
+
+    if not settings.CACHE_IS_SHARED:
+        return [load_user_ids(model, user_id) for model in models]
+    keys = [
+        USER_IDS_KEY.format(model._meta.model_name, user_id)
+        for model in models
+    ]
+    cached = cache.get_many(keys)
+    missing = {}
+    result = []
+    for model, key in zip(models, keys):
+        ids = cached.get(key)
+        if ids is None:
+            ids = load_user_ids(model, user_id)
+            missing[key] = ids
+        result.append(ids)
+    if missing:
+        cache.set_many(missing, USER_IDS_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate_user_ids(model, user_id):
+    """Сбрасывает множество id списка пользователя после фиксации
+       транзакции.
+    """
+
+    if settings.CACHE_IS_SHARED:
+        key = USER_IDS_KEY.format(model._meta.model_name, user_id)
+        transaction.on_commit(partial(cache.delete, key))
+
+
+class CachedResponseMixin:
+    """Кеширует ответы list/retrieve и отвечает 304 на условные запросы.
+
+    Ответы хранятся под текущей версией пространства имён
+    cache_namespace; при изменении данных версия увеличивается
+    сигналами, и старые записи перестают использоваться. Ответы
+    не кешируются, только если кеш не общий для воркеров
+    (CACHE_IS_SHARED): с одним воркером подходит и кеш в памяти.
+    """
+
+    cache_namespace = None
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not settings.CACHE_IS_SHARED:
+            return handler(request, *args, **kwargs)
+        version, modified = get_version(self.cache_namespace)
+        path = hashlib.md5(
+            request.get_full_path().encode()).hexdigest()
+        etag = f'"{self.cache_namespace}-{version}-{path[:8]}"'
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=modified)
+
+        if response is None:
+            key = RESPONSE_KEY.format(self.cache_namespace, version, path)
+            data = cache.get(key)
+            if data is None:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                data = response.data
+                cache.set(key, data, RESPONSE_CACHE_TIMEOUT)
+            response = Response(data)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs)
@@ -20,3 +20,59 @@ MAX_COOK_TIME_VALUE = 480
 MIN_COOK_TIME_VALUE_MSG = 'Значение должно быть не меньше "1".'
 MAX_COOK_TIME_VALUE_MSG = 'Готовить 8 часов? Такой рецепт тут не нужен!'
 STR_LENGHT = 15
+SHOPPING_CART_FILENAME = 'Список_покупок'
+SHOPPING_CART_FILE_TYPE_PARAM = 'file_type'
+SHOPPING_CART_FILE_TYPE_MSG = 'Неизвестный формат файла. Доступны: {}.'
+SHOPPING_CART_FONT = 'Times'
+SHOPPING_CART_FONT_FILE = 'times.ttf'
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+TRIGRAM_SIMILARITY_THRESHOLD = 0.4
+INGREDIENT_INDEX_CHECK_INTERVAL = 60
+RECIPES_LIMIT_PARAM = 'recipes_limit'
+NO_TAG_MSG = 'Тегов с такими id не существует: {}.'
+NO_INGR_MSG = 'Ингредиентов с такими id не существует: {}.'
+REQUIRED_FIELD_MSG = 'Поле {} обязательно.'
+RESPONSE_CACHE_TIMEOUT = 60 * 10
+COUNT_CACHE_TIMEOUT = 60
+RECIPE_CACHE_TIMEOUT = 60 * 10
+USER_IDS_CACHE_TIMEOUT = 60 * 10
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+IMAGE_SIZE_MSG = 'Размер изображения не должен превышать 10 МБ.'
+IMAGE_PIXELS_MSG = 'Разрешение изображения слишком велико.'
+INVALID_IMAGE_MSG = 'Загрузите корректное изображение.'
+IMAGE_RENDITIONS = {
+    'thumbnail': ((320, 320), 'JPEG'),
+    'thumbnail_webp': ((320, 320), 'WEBP'),
+    'medium': ((800, 800), 'JPEG'),
+    'medium_webp': ((800, 800), 'WEBP'),
+}
+SEARCH_CONFIG = 'russian'
+RECIPE_SEARCH_LIMIT = 300
+FEED_MAX_ITEMS = 1000
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_CELEBRITY_FOLLOWERS = 10000
+FEED_TRIM_SLACK = 50
+MIN_SERVINGS = 1
+MAX_SERVINGS = 100
+MIN_SERVINGS_MSG = 'Количество порций должно быть не меньше 1.'
+MAX_SERVINGS_MSG = 'Количество порций должно быть не больше 100.'
+CART_BATCH_SIZE = 1000
+BATCH_MAX_RECIPES = 100
+CURSOR_ORDERING_MSG = ('Пагинация по курсору поддерживает только '
+                       'сортировку по полю {}.')
+BATCH_EMPTY_MSG = 'Передайте id рецептов в add или remove.'
+BATCH_CONFLICT_MSG = 'Рецепты нельзя одновременно добавить и удалить: {}.'
+BATCH_ADDED = 'added'
+BATCH_ALREADY_ADDED = 'already_added'
+BATCH_NOT_FOUND = 'not_found'
+BATCH_REMOVED = 'removed'
+BATCH_NOT_IN_LIST = 'not_in_list'
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TIMEOUT = 60
+CPU_POOL_SIZE = 2
+REPLICA_HEALTH_INTERVAL = 10
+CONN_HEALTH_CHECK_INTERVAL = 30
+BOOT_IMPORT_BUDGET_MS = 1500
+LAZY_MODULES = ('reportlab',)
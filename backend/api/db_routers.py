@@ -0,0 +1,127 @@
+import logging
+import random
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from api.constants import REPLICA_HEALTH_INTERVAL
+
+logger = logging.getLogger('api.db')
+
+STICKY_COOKIE = 'db_sticky'
+# Токены читаются с основной БД: сразу после входа нового токена
+# на реплике может ещё не быть.
+PRIMARY_MODELS = {'authtoken.token'}
+
+state = Local()
+
+
+class ReplicaHealth:
+    """Доступность реплик, проверяется не чаще раза
+       в REPLICA_HEALTH_INTERVAL секунд на процесс.
+    """
+
+    def __init__(self):
+        self.checked = {}
+
+    def is_healthy(self, alias):
+        healthy, checked_at = self.checked.get(alias, (False, None))
+        now = time.monotonic()
+        if checked_at is not None and now - checked_at < (
+                REPLICA_HEALTH_INTERVAL):
+            return healthy
+
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            healthy = True
+        except DatabaseError as error:
+            logger.warning('Реплика %s недоступна: %s', alias, error)
+            healthy = False
+        self.checked[alias] = (healthy, now)
+        return healthy
+
+    def mark_unhealthy(self, alias):
+        self.checked[alias] = (False, time.monotonic())
+
+
+replica_health = ReplicaHealth()
+
+
+def choose_replica():
+    """Случайная доступная реплика или None, если доступных нет."""
+
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_health.is_healthy(alias)
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+def is_sticky(request):
+    """Писал ли клиент в БД в последние
+       DATABASE_REPLICA_STICKY_SECONDS секунд.
+
+    Отметка хранится в подписанной cookie с меткой времени, а не в
+    кеше процесса, поэтому её видит любой воркер.
+    """
+
+    return request.get_signed_cookie(
+        STICKY_COOKIE, default=None, salt=STICKY_COOKIE,
+        max_age=settings.DATABASE_REPLICA_STICKY_SECONDS) is not None
+
+
+def make_sticky(response):
+    response.set_signed_cookie(
+        STICKY_COOKIE, '1', salt=STICKY_COOKIE,
+        max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+        httponly=True, samesite='Lax')
+
+
+def begin_request(replica):
+    """Задаёт реплику для чтения в текущем запросе (None - основная БД)."""
+
+    state.replica = replica
+    state.wrote = False
+
+
+def end_request():
+    """Сбрасывает состояние запроса, возвращает True,
+       если в запросе была запись.
+    """
+
+    wrote = getattr(state, 'wrote', False)
+    state.replica = None
+    state.wrote = False
+    return wrote
+
+
+def get_replica():
+    return getattr(state, 'replica', None)
+
+
+class ReplicaRouter:
+    """Направляет чтение в реплику, выбранную для запроса
+       ReplicaRoutingMiddleware, а запись - в основную БД.
+
+    После первой записи оставшиеся чтения запроса тоже идут
+    в основную БД, чтобы запрос видел свои изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        return get_replica()
+
+    def db_for_write(self, model, **hints):
+        state.replica = None
+        state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,317 @@
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+
+from api.cache import get_recipe_keys, get_tags, get_user_ids
+from api.constants import RECIPE_CACHE_TIMEOUT
+from recipes.images import get_rendition_name
+from recipes.models import (Favorite, IngredientsForRecipe, Recipe,
+                            ShoppingList)
+from users.models import Follow
+
+AUTHOR_VALUES = {
+    'email': 'author__email',
+    'id': 'author_id',
+    'username': 'author__username',
+    'first_name': 'author__first_name',
+    'last_name': 'author__last_name',
+}
+# Поля, которые меняются без правки рецепта (счётчики, профиль
+# автора), читаются из выборки; pub_date нужен пагинации по курсору.
+RECIPE_VALUES = (
+    'id', 'pub_date', 'favorites_count', 'in_carts_count',
+    'author__recipes_count', 'author__followers_count',
+    *AUTHOR_VALUES.values(),
+)
+SHARED_RECIPE_VALUES = ('id', 'name', 'image', 'text', 'cooking_time')
+SHORT_RECIPE_VALUES = ('id', 'name', 'image', 'cooking_time')
+FOLLOW_VALUES = ('id', 'user_id', 'author__recipes_count',
+                 *AUTHOR_VALUES.values())
+DOT_SEGMENT = re.compile(r'(^|/)\.\.?(/|$)')
+RENDITIONS = (
+    ('image_thumbnail', 'thumbnail'),
+    ('image_thumbnail_webp', 'thumbnail_webp'),
+    ('image_medium', 'medium'),
+    ('image_medium_webp', 'medium_webp'),
+)
+
+
+def recipe_rows(queryset):
+    """Выборка рецептов словарями для RecipeFastSerializer.
+       Аннотации выборки (ранг поиска, дата в ленте) сохраняются:
+       по ним работает пагинация.
+    """
+
+    return queryset.prefetch_related(None).values(
+        *RECIPE_VALUES, *queryset.query.annotations)
+
+
+def follow_rows(queryset):
+    """Выборка подписок словарями для FollowerFastSerializer."""
+
+    return queryset.prefetch_related(None).values(*FOLLOW_VALUES)
+
+
+class FastSerializer:
+    """Сериалайзер только для чтения, собирающий представления
+       из словарей .values() без полей DRF.
+
+    Вывод совпадает с соответствующим сериалайзером DRF: тот же
+    порядок ключей и те же значения. Поддерживает instance, many,
+    context и data.
+    """
+
+    def __init__(self, instance, many=False, context=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        request = self.context.get('request')
+        self.request = request
+        self.user = getattr(request, 'user', None)
+        self.host = request.build_absolute_uri('/')[:-1] if request else ''
+
+    @property
+    def data(self):
+        rows = list(self.instance) if self.many else [self.instance]
+        items = self.to_representation(rows)
+        return items if self.many else items[0]
+
+    def to_representation(self, rows):
+        raise NotImplementedError(
+            f'{self.__class__.__name__} must implement '
+            f'`to_representation()`.')
+
+    def get_storage_url(self, name):
+        """default_storage.url без urljoin для файлового хранилища:
+           путь файла дописывается к MEDIA_URL.
+        """
+
+        if not isinstance(default_storage, FileSystemStorage):
+            return default_storage.url(name)
+        base_url = default_storage.base_url
+        path = filepath_to_uri(name).lstrip('/')
+        if not base_url.endswith('/') or DOT_SEGMENT.search(path):
+            return default_storage.url(name)
+        return base_url + path
+
+    def get_url(self, name):
+        return self.get_absolute_url(self.get_storage_url(name))
+
+    def get_absolute_url(self, url):
+        """URL как у request.build_absolute_uri, но с адресом сайта,
+           вычисленным один раз на запрос.
+        """
+
+        if self.request is None:
+            return url
+        if (url.startswith('/') and not url.startswith('//')
+                and '/./' not in url and '/../' not in url):
+            return self.host + url
+        return self.request.build_absolute_uri(url)
+
+    def add_images(self, item, image):
+        """Добавляет ссылки на изображение и его уменьшенные копии."""
+
+        item['image'] = self.get_url(image) if image else None
+        for key, rendition in RENDITIONS:
+            item[key] = (self.get_url(get_rendition_name(image, rendition))
+                         if image else None)
+
+    def get_short_recipe(self, row):
+        item = {
+            'id': row['id'],
+            'name': row['name'],
+            'image': None,
+            'cooking_time': row['cooking_time'],
+        }
+        self.add_images(item, row['image'])
+        return item
+
+
+class RecipeFastSerializer(FastSerializer):
+    """Быстрый аналог RecipeSerializer для чтения.
+
+    Строки берутся из recipe_rows(RecipeViewSet.get_queryset()).
+    Общая для всех пользователей часть рецепта (теги, ингредиенты,
+    текст, изображения) кешируется по id рецепта, а флаги пользователя
+    берутся из закешированных множеств его избранного, списка покупок
+    и подписок. С одним воркером для этого подходит и кеш в памяти
+    процесса. Только если кеш не общий для воркеров (CACHE_IS_SHARED),
+    флаги приходят аннотациями строк, а общая часть собирается из БД.
+    """
+
+    def get_ingredients(self, recipe_ids):
+        ingredients = defaultdict(list)
+        amounts = IngredientsForRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('ingredient__name').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount',
+        )
+        for recipe_id, pk, name, measurement_unit, amount in amounts:
+            ingredients[recipe_id].append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+                'amount': amount,
+            })
+        return ingredients
+
+    def get_tags(self, recipe_ids):
+        tags = get_tags()
+        recipe_tags = defaultdict(list)
+        pairs = Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('tag__name').values_list('recipe_id', 'tag_id')
+        for recipe_id, tag_id in pairs:
+            recipe_tags[recipe_id].append(tags[tag_id])
+        return recipe_tags
+
+    def build_shared(self, recipe_ids):
+        """Общие представления рецептов из БД: {id: представление}.
+           Ссылки на изображения - без адреса сайта.
+        """
+
+        tags = self.get_tags(recipe_ids)
+        ingredients = self.get_ingredients(recipe_ids)
+        recipes = Recipe.objects.filter(
+            pk__in=recipe_ids).values(*SHARED_RECIPE_VALUES)
+        shared = {}
+        for row in recipes:
+            image = row['image']
+            shared[row['id']] = {
+                'tags': tags[row['id']],
+                'ingredients': ingredients[row['id']],
+                'name': row['name'],
+                'text': row['text'],
+                'cooking_time': row['cooking_time'],
+                'images': [
+                    self.get_storage_url(name) for name in (
+                        image, *(get_rendition_name(image, rendition)
+                                 for _, rendition in RENDITIONS))
+                ] if image else None,
+            }
+        return shared
+
+    def get_shared(self, recipe_ids):
+        """Общие представления рецептов из кеша, недостающие
+           собираются из БД и кешируются.
+        """
+
+        if not settings.CACHE_IS_SHARED:
+            return self.build_shared(recipe_ids)
+        keys = get_recipe_keys(recipe_ids)
+        cached = cache.get_many(keys.values())
+        shared = {
+            pk: cached[key] for pk, key in keys.items() if key in cached
+        }
+        missing = [pk for pk in recipe_ids if pk not in shared]
+        if missing:
+            built = self.build_shared(missing)
+            cache.set_many(
+                {keys[pk]: recipe for pk, recipe in built.items()},
+                RECIPE_CACHE_TIMEOUT)
+            shared.update(built)
+        return shared
+
+    def add_cached_images(self, item, urls):
+        """Как add_images, но из ссылок общего представления."""
+
+        if urls is None:
+            urls = [None] * (len(RENDITIONS) + 1)
+        else:
+            urls = [self.get_absolute_url(url) for url in urls]
+        item['image'] = urls[0]
+        for (key, _), url in zip(RENDITIONS, urls[1:]):
+            item[key] = url
+
+    def get_user_ids(self, rows):
+        """Избранное, список покупок и подписки пользователя
+           среди рецептов и авторов страницы.
+        """
+
+        if self.user is None or self.user.is_anonymous:
+            return frozenset(), frozenset(), frozenset()
+        if 'is_favorited' in rows[0]:
+            return (
+                {row['id'] for row in rows if row['is_favorited']},
+                {row['id'] for row in rows if row['is_in_shopping_cart']},
+                {row['author_id'] for row in rows
+                 if row['author_is_subscribed']},
+            )
+        return get_user_ids(self.user.pk, Favorite, ShoppingList, Follow)
+
+    def to_representation(self, rows):
+        recipe_ids = [row['id'] for row in rows]
+        if not recipe_ids:
+            return []
+        shared = self.get_shared(recipe_ids)
+        favorites, cart, follows = self.get_user_ids(rows)
+
+        items = []
+        for row in rows:
+            recipe = shared.get(row['id'])
+            if recipe is None:
+                # Рецепт удалён между запросами.
+                continue
+            author = {key: row[value] for key, value in AUTHOR_VALUES.items()}
+            author['is_subscribed'] = row['author_id'] in follows
+            author['recipes_count'] = row['author__recipes_count']
+            author['followers_count'] = row['author__followers_count']
+            item = {
+                'id': row['id'],
+                'tags': recipe['tags'],
+                'author': author,
+                'ingredients': recipe['ingredients'],
+                'is_favorited': row['id'] in favorites,
+                'is_in_shopping_cart': row['id'] in cart,
+                'name': recipe['name'],
+                'image': None,
+                'text': recipe['text'],
+                'cooking_time': recipe['cooking_time'],
+                'favorites_count': row['favorites_count'],
+                'in_carts_count': row['in_carts_count'],
+            }
+            self.add_cached_images(item, recipe['images'])
+            items.append(item)
+        return items
+
+
+class FollowerFastSerializer(FastSerializer):
+    """Быстрый аналог FollowerSerializer для чтения.
+
+    Рецепты авторов страницы берутся одним запросом из
+    context['recipes'] - выборки рецептов с учётом recipes_limit.
+    """
+
+    def to_representation(self, rows):
+        recipes = defaultdict(list)
+        # Как и в FollowerSerializer, вложенные рецепты собираются
+        # без запроса в контексте: ссылки на изображения относительные.
+        short = FastSerializer(None)
+        author_ids = [row['author_id'] for row in rows]
+        if author_ids:
+            author_recipes = self.context['recipes'].filter(
+                author_id__in=author_ids
+            ).values('author_id', *SHORT_RECIPE_VALUES)
+            for row in author_recipes:
+                recipes[row['author_id']].append(short.get_short_recipe(row))
+        user_id = getattr(self.user, 'id', None)
+
+        return [
+            {
+                'id': row['author_id'],
+                'email': row['author__email'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': row['user_id'] == user_id,
+                'recipes': recipes[row['author_id']],
+                'recipes_count': row['author__recipes_count'],
+            }
+            for row in rows
+        ]
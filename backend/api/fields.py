@@ -0,0 +1,58 @@
+import io
+
+from django import forms
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+from api.constants import (IMAGE_PIXELS_MSG, IMAGE_SIZE_MSG,
+                           INVALID_IMAGE_MSG, MAX_IMAGE_PIXELS,
+                           MAX_IMAGE_SIZE)
+from recipes.images import get_rendition_name
+
+
+class RecipeImageField(Base64ImageField):
+    """Изображение в base64. Проверяются только размер данных
+       и заголовок файла, без полного декодирования пикселей.
+    """
+
+    _DjangoImageField = forms.FileField
+
+    def to_internal_value(self, base64_data):
+        if (isinstance(base64_data, str)
+                and len(base64_data.split(';base64,')[-1]) * 3 // 4
+                > MAX_IMAGE_SIZE):
+            raise serializers.ValidationError(IMAGE_SIZE_MSG)
+        return super().to_internal_value(base64_data)
+
+    def get_file_extension(self, filename, decoded_file):
+        try:
+            image = Image.open(io.BytesIO(decoded_file))
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(INVALID_IMAGE_MSG)
+
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise serializers.ValidationError(IMAGE_PIXELS_MSG)
+
+        extension = image.format.lower()
+        return 'jpg' if extension == 'jpeg' else extension
+
+
+class ImageRenditionField(serializers.ReadOnlyField):
+    """Ссылка на уменьшенную копию изображения рецепта."""
+
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs.setdefault('source', 'image')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+
+        url = value.storage.url(
+            get_rendition_name(value.name, self.rendition))
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
@@ -1,21 +1,138 @@
-from django_filters import AllValuesMultipleFilter
+from collections import defaultdict
+
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import (Case, Exists, F, FloatField, IntegerField,
+                              OuterRef, Value, When)
+from django.db.models.functions import Cast
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import OrderingFilter, SearchFilter
 
-from rest_framework.filters import SearchFilter
-from recipes.models import Recipe
+from api.cache import get_tag_map
+from api.constants import (INGREDIENT_SEARCH_LIMIT,
+                           INGREDIENT_SEARCH_MAX_LIMIT, RECIPE_SEARCH_LIMIT,
+                           SEARCH_CONFIG, TYPE_ERROR_MSG)
+from api.search import ingredient_index, recipe_index
+from recipes.models import Favorite, Recipe, ShoppingList
 
 
 class IngredientSearchFilter(SearchFilter):
-    """Поиск ингредиентов."""
+    """Поиск ингредиентов по индексу в памяти процесса.
+       Количество результатов задаётся параметром limit.
+    """
 
     search_param = 'name'
+    limit_param = 'limit'
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_param])
+        except (KeyError, ValueError):
+            return INGREDIENT_SEARCH_LIMIT
+        return min(max(limit, 1), INGREDIENT_SEARCH_MAX_LIMIT)
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+
+        if not query:
+            return queryset
+
+        ids = ingredient_index.search(query, self.get_limit(request))
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *(When(pk=pk, then=Value(position))
+              for position, pk in enumerate(ids)),
+            output_field=IntegerField(),
+        ))
+
+
+class RecipeSearchFilter(SearchFilter):
+    """Полнотекстовый поиск рецептов по названию и описанию.
+
+    В PostgreSQL используется сохраняемый поисковый вектор с GIN-индексом
+    и русским стеммингом, на других СУБД - индекс в памяти процесса.
+    В PostgreSQL ранжируются все найденные по индексу рецепты, а страницу
+    выбирает пагинатор; индекс в памяти возвращает не более
+    RECIPE_SEARCH_LIMIT лучших по рангу. Найденные рецепты получают
+    аннотацию rank.
+    """
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+
+        if not query:
+            return queryset
+
+        if connections[queryset.db].vendor == 'postgresql':
+            search_query = SearchQuery(
+                query, config=SEARCH_CONFIG, search_type='websearch')
+            # ts_rank возвращает real; double precision без потерь
+            # переживает сериализацию в курсор пагинации.
+            return queryset.filter(search_vector=search_query).annotate(
+                rank=Cast(SearchRank(F('search_vector'), search_query),
+                          FloatField()))
+
+        ids_by_rank = defaultdict(list)
+        for pk, rank in recipe_index.search(query, RECIPE_SEARCH_LIMIT):
+            ids_by_rank[rank].append(pk)
+        if not ids_by_rank:
+            return queryset.none().annotate(
+                rank=Value(0.0, output_field=FloatField()))
+
+        return queryset.filter(
+            pk__in=[pk for ids in ids_by_rank.values() for pk in ids]
+        ).annotate(rank=Case(
+            *(When(pk__in=ids, then=Value(rank))
+              for rank, ids in ids_by_rank.items()),
+            output_field=FloatField(),
+        ))
+
+
+class MultipleIntegerField(forms.Field):
+    """Поле формы для повторяющегося целочисленного параметра."""
+
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return [int(item) for item in value]
+        except (TypeError, ValueError):
+            raise ValidationError(TYPE_ERROR_MSG)
+
+
+class NumberInFilter(filters.Filter):
+    """Фильтр по списку id без выборки всех возможных значений."""
+
+    field_class = MultipleIntegerField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(**{f'{self.field_name}__in': value})
+
+
+def get_tag_choices():
+    return [(slug, slug) for slug in get_tag_map()]
 
 
 class RecipeFilter(FilterSet):
-    """Фильтр для объектов модели Recipe."""
+    """Фильтр для объектов модели Recipe.
 
-    author = AllValuesMultipleFilter(field_name='author__id')
-    tags = AllValuesMultipleFilter(field_name='tags__slug')
+    Теги и флаги пользователя проверяются подзапросами EXISTS,
+    поэтому рецепты в выдаче не дублируются и DISTINCT не нужен.
+    """
+
+    author = NumberInFilter(field_name='author_id')
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method='filter_tags')
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart')
@@ -24,11 +141,21 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
 
+    def filter_tags(self, queryset, name, value):
+        """Показывает рецепты, у которых есть хотя бы один из тегов."""
+
+        tag_map = get_tag_map()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=[tag_map[slug] for slug in value],
+        )))
+
     def get_is_favorited(self, queryset, name, value):
         """Показывает только избранные рецепты."""
 
         if self.request.user.is_authenticated and value:
-            return queryset.filter(favorite__user=self.request.user)
+            return queryset.filter(Exists(Favorite.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk'))))
 
         return queryset
 
@@ -36,6 +163,29 @@ class RecipeFilter(FilterSet):
         """Показывает рецепты, добавленные в список покупок."""
 
         if self.request.user.is_authenticated and value:
-            return queryset.filter(shopping_list__user=self.request.user)
+            return queryset.filter(Exists(ShoppingList.objects.filter(
+                user=self.request.user, recipe=OuterRef('pk'))))
 
         return queryset
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов. Для однозначного порядка при равных
+       значениях добавляется сортировка по дате публикации и id.
+       При поиске по умолчанию рецепты сортируются по рангу.
+    """
+
+    tiebreaker = ('-pub_date', '-id')
+
+    def get_default_ordering(self, view):
+        if RecipeSearchFilter().get_search_query(view.request):
+            return ['-rank']
+        return super().get_default_ordering(view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        fields = {field.lstrip('-') for field in ordering}
+        return ordering + [
+            field for field in self.tiebreaker
+            if field.lstrip('-') not in fields
+        ]
@@ -0,0 +1,125 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+from api.db_routers import (begin_request, choose_replica, end_request,
+                            get_replica, is_sticky, make_sticky,
+                            replica_health)
+
+logger = logging.getLogger('api.sql')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PLACEHOLDERS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def get_fingerprint(sql):
+    """Схлопывает списки параметров, чтобы IN (...) разной длины
+       считались одним запросом.
+    """
+
+    return PLACEHOLDERS.sub('(...)', sql)
+
+
+class QueryStats:
+    """Счётчик запросов к БД, подключается через execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.statements.values())
+
+    def get_top(self, limit):
+        fingerprints = Counter()
+        for sql, count in self.statements.items():
+            fingerprints[get_fingerprint(sql)] += count
+        return [item for item in fingerprints.most_common(limit)
+                if item[1] > 1]
+
+
+class QueryInstrumentationMiddleware:
+    """Считает запросы к БД, их суммарное время и повторы за запрос.
+
+    Добавляет заголовок Server-Timing и пишет в лог api.sql запросы,
+    превысившие SLOW_REQUEST_QUERIES или SLOW_REQUEST_MS.
+    Работает при DEBUG=False: connection.queries не используется.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(stats))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = stats.duration * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={sql_ms:.1f};desc="{stats.count} queries, '
+            f'{stats.duplicates} duplicates", app;dur={total_ms:.1f}'
+        )
+
+        if (stats.count >= settings.SLOW_REQUEST_QUERIES
+                or total_ms >= settings.SLOW_REQUEST_MS):
+            logger.warning(
+                '%s %s: %d ms, %d queries (%d duplicates), %.1f ms in SQL. '
+                'Top repeated: %s',
+                request.method, request.get_full_path(), total_ms,
+                stats.count, stats.duplicates, sql_ms,
+                stats.get_top(settings.SLOW_REQUEST_TOP_SQL),
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Выбирает реплику БД для чтения в безопасных запросах к API.
+
+    Клиент, писавший в БД, в течение DATABASE_REPLICA_STICKY_SECONDS
+    читает с основной БД и видит свои изменения. Реплика, на которой
+    запрос упал с ошибкой соединения, до следующей проверки считается
+    недоступной.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replica = None
+        if (request.method in SAFE_METHODS
+                and request.path.startswith('/api/')
+                and not is_sticky(request)):
+            replica = choose_replica()
+        begin_request(replica)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = end_request()
+        if wrote:
+            make_sticky(response)
+        return response
+
+    def process_exception(self, request, exception):
+        replica = get_replica()
+        if replica is not None and isinstance(exception, OperationalError):
+            replica_health.mark_unhealthy(replica)
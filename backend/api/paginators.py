@@ -1,10 +1,133 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+from api.constants import COUNT_CACHE_TIMEOUT, CURSOR_ORDERING_MSG
+
+
+def get_cached_count(queryset):
+    """Количество объектов в выборке, кешируется на короткое время."""
+
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        # Выборка .none(): запрос к БД не нужен.
+        return 0
+    key = 'count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.values('pk').count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class CountPaginator(Paginator):
+    """Считает только первичные ключи: аннотации выборки
+       (флаги пользователя и т.п.) не попадают в COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        return self.object_list.values('pk').count()
+
+
+class CursorPaginationMod(CursorPagination):
+    """Пагинация по курсору без COUNT(*) и OFFSET.
+       Количество объектов добавляется в ответ только по запросу
+       с параметром count.
+
+    Позиция курсора в DRF строится по первому полю сортировки, поэтому
+    сортировка, заданная фильтром, должна начинаться с того же поля,
+    что и ordering: по счётчикам или рангу поиска с множеством равных
+    значений курсор свёлся бы к OFFSET и пропускал или повторял
+    объекты на меняющихся данных.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = 6
+    count_query_param = 'count'
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        field = self.ordering[0].lstrip('-')
+        if ordering[0].lstrip('-') != field:
+            raise ValidationError(
+                {self.cursor_query_param: CURSOR_ORDERING_MSG.format(field)})
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param):
+            self.count = get_cached_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]
+        if self.count is not None:
+            response.insert(0, ('count', self.count))
+        return Response(OrderedDict(response))
 
 
 class PageNumberPaginationMod(PageNumberPagination):
     """Пользовательская пагинация. Отображает на странице
-       шесть записей.
+       шесть записей. Если задан cursor_ordering, то при наличии
+       параметра cursor включается пагинация по курсору.
     """
 
+    django_paginator_class = CountPaginator
     page_size_query_param = 'limit'
     page_size = 6
+    cursor_query_param = 'cursor'
+    cursor_ordering = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if (self.cursor_ordering is not None
+                and self.cursor_query_param in request.query_params):
+            self.cursor_paginator = CursorPaginationMod(self.cursor_ordering)
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RecipePagination(PageNumberPaginationMod):
+    """Пагинация рецептов, курсор по дате публикации."""
+
+    cursor_ordering = ('-pub_date', '-id')
+
+
+class UserPagination(PageNumberPaginationMod):
+    """Пагинация пользователей, курсор по id."""
+
+    cursor_ordering = ('id', )
+
+
+class FollowPagination(PageNumberPaginationMod):
+    """Пагинация подписок, курсор по id."""
+
+    cursor_ordering = ('-id', )
+
+
+class FeedPagination(PageNumberPaginationMod):
+    """Пагинация ленты подписок, курсор по дате рецепта в ленте."""
+
+    cursor_ordering = ('-feed_pub_date', '-id')
@@ -0,0 +1,26 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Даты, Decimal, ленивые строки и QuerySet передаются в кодировщик
+# DRF, чтобы вывод совпадал с JSONRenderer.
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson: тот же компактный UTF-8 вывод,
+       но в несколько раз быстрее. С отступами (indent в Accept)
+       рендерит стандартный JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+
+        return orjson.dumps(
+            data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
@@ -0,0 +1,258 @@
+import heapq
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from threading import Lock
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from api.cache import get_version
+from api.constants import (INGREDIENT_INDEX_CHECK_INTERVAL,
+                           TRIGRAM_SIMILARITY_THRESHOLD)
+from recipes.models import Ingredient, Recipe
+
+WORD_RE = re.compile(r'\w+')
+
+# Окончания для грубого стемминга русских слов, от длинных к коротким.
+RUSSIAN_ENDINGS = (
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ой', 'ий', 'ый', 'ая', 'яя',
+    'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ть',
+    'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'й', 'ь',
+)
+MIN_STEM_LENGTH = 3
+
+# Веса слов из названия и описания, как у setweight 'A' и 'B'
+# в ts_rank PostgreSQL.
+NAME_WEIGHT = 1.0
+TEXT_WEIGHT = 0.4
+
+
+def get_trigrams(value):
+    """Триграммы строки в стиле pg_trgm: слова дополняются пробелами."""
+
+    trigrams = set()
+    for word in value.split():
+        padded = f'  {word} '
+        trigrams.update(
+            padded[i:i + 3] for i in range(len(padded) - 2)
+        )
+    return trigrams
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса.
+
+    Строится лениво при первом поиске и сбрасывается сигналами
+    при изменении модели Ingredient. Изменения из других процессов
+    (воркеров, load_db) видны по версии 'ingredients' в кеше. Кеш
+    в памяти процесса эту версию из другого процесса не получит,
+    поэтому с ним число ингредиентов и наибольший id дополнительно
+    проверяются не чаще раза в INGREDIENT_INDEX_CHECK_INTERVAL
+    секунд. Совпадения по началу названия
+    идут первыми, затем совпадения по подстроке, затем похожие
+    по триграммам названия (для запросов с опечатками).
+    """
+
+    separator = '\n'
+
+    def __init__(self):
+        self._lock = Lock()
+        self._data = None
+        self._version = None
+        self._db_version = None
+        self._checked_at = None
+
+    def invalidate(self):
+        self._data = None
+
+    def get_db_version(self):
+        now = time.monotonic()
+        if (self._checked_at is None
+                or now - self._checked_at >= INGREDIENT_INDEX_CHECK_INTERVAL):
+            self._db_version = tuple(Ingredient.objects.aggregate(
+                count=Count('id'), last=Max('id')).values())
+            self._checked_at = now
+        return self._db_version
+
+    def get_version(self):
+        version = get_version('ingredients')[0]
+        if (settings.CACHES['default']['BACKEND']
+                not in settings.PROCESS_LOCAL_CACHES):
+            return version
+        return version, self.get_db_version()
+
+    def warm_up(self):
+        """Строит индекс заранее, например до форка воркеров."""
+
+        self._get_data()
+
+    def _build(self):
+        ingredients = sorted(
+            Ingredient.objects.all(),
+            key=lambda ingredient: (ingredient.name.lower(), ingredient.id)
+        )
+        keys = [ingredient.name.lower() for ingredient in ingredients]
+        offsets = []
+        offset = 0
+        for key in keys:
+            offsets.append(offset)
+            offset += len(key) + len(self.separator)
+        postings = defaultdict(list)
+        for position, key in enumerate(keys):
+            for trigram in get_trigrams(key):
+                postings[trigram].append(position)
+        return (ingredients, keys, self.separator.join(keys), offsets,
+                dict(postings))
+
+    def _get_data(self):
+        version = self.get_version()
+        data = self._data
+        if data is None or self._version != version:
+            with self._lock:
+                if self._data is None or self._version != version:
+                    self._data = self._build()
+                    self._version = version
+                data = self._data
+        return data
+
+    def search(self, query, limit):
+        """Не более limit id ингредиентов в порядке релевантности."""
+
+        query = query.strip().lower()
+        if not query or self.separator in query:
+            return []
+        ingredients, keys, text, offsets, postings = self._get_data()
+
+        result = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(query)):
+            result.append(position)
+            position += 1
+        found = set(result)
+
+        substring = []
+        index = text.find(query)
+        while index != -1 and len(found) + len(substring) < 10 * limit:
+            position = bisect_right(offsets, index) - 1
+            if position not in found:
+                substring.append((index - offsets[position], position))
+            index = text.find(query, offsets[position] + len(keys[position]))
+        substring.sort()
+        for _, position in substring:
+            result.append(position)
+            found.add(position)
+
+        if len(result) < limit:
+            query_trigrams = get_trigrams(query)
+            matches = Counter()
+            for trigram in query_trigrams:
+                matches.update(postings.get(trigram, ()))
+            threshold = TRIGRAM_SIMILARITY_THRESHOLD * len(query_trigrams)
+            similar = sorted(
+                (-count, len(keys[position]), position)
+                for position, count in matches.items()
+                if count >= threshold and position not in found
+            )
+            result.extend(position for _, _, position in similar)
+
+        return [ingredients[position].pk for position in result[:limit]]
+
+
+def get_terms(value):
+    """Основы слов строки, ё заменяется на е."""
+
+    terms = set()
+    for word in WORD_RE.findall(value.lower().replace('ё', 'е')):
+        for ending in RUSSIAN_ENDINGS:
+            if (word.endswith(ending)
+                    and len(word) - len(ending) >= MIN_STEM_LENGTH):
+                word = word[:-len(ending)]
+                break
+        terms.add(word)
+    return terms
+
+
+class RecipeIndex:
+    """Обратный индекс рецептов в памяти процесса.
+
+    Используется для полнотекстового поиска, когда база данных
+    не PostgreSQL. Строится лениво при первом поиске и обновляется
+    сигналами при изменении рецептов. Рецепт находится, если
+    содержит все слова запроса; слова из названия весят больше,
+    чем слова из описания.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._postings = None
+        self._terms = None
+
+    def invalidate(self):
+        with self._lock:
+            self._postings = None
+            self._terms = None
+
+    def _add(self, pk, name, text):
+        weights = dict.fromkeys(get_terms(text), TEXT_WEIGHT)
+        weights.update(dict.fromkeys(get_terms(name), NAME_WEIGHT))
+        for term, weight in weights.items():
+            self._postings[term][pk] = weight
+        self._terms[pk] = tuple(weights)
+
+    def _remove(self, pk):
+        for term in self._terms.pop(pk, ()):
+            self._postings[term].pop(pk, None)
+
+    def _build(self):
+        self._postings = defaultdict(dict)
+        self._terms = {}
+        recipes = Recipe.objects.values_list('id', 'name', 'text')
+        for pk, name, text in recipes.iterator():
+            self._add(pk, name, text)
+
+    def warm_up(self):
+        """Строит индекс заранее, например до форка воркеров."""
+
+        with self._lock:
+            if self._postings is None:
+                self._build()
+
+    def update(self, recipe):
+        with self._lock:
+            if self._postings is not None:
+                self._remove(recipe.pk)
+                self._add(recipe.pk, recipe.name, recipe.text)
+
+    def remove(self, pk):
+        with self._lock:
+            if self._postings is not None:
+                self._remove(pk)
+
+    def search(self, query, limit):
+        """Не более limit пар (id рецепта, ранг) по убыванию ранга."""
+
+        terms = get_terms(query)
+        if not terms:
+            return []
+
+        with self._lock:
+            if self._postings is None:
+                self._build()
+            postings = sorted(
+                (self._postings.get(term, {}) for term in terms), key=len)
+            ranks = {
+                pk: weight + sum(posting[pk] for posting in postings[1:])
+                for pk, weight in postings[0].items()
+                if all(pk in posting for posting in postings[1:])
+            }
+
+        return heapq.nsmallest(
+            limit, ranks.items(), key=lambda item: (-item[1], -item[0]))
+
+
+ingredient_index = IngredientIndex()
+recipe_index = RecipeIndex()
@@ -1,15 +1,24 @@
+from django.db import transaction
 from django.db.models import F
-from django.shortcuts import get_object_or_404
-from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from api.constants import (ERROR_NAME_MSG, MIN_COOKING_TIME, MIN_INGR_ERR_MSG,
-                           MIN_INGR_MSG, MIN_VALUE_MSG, NO_UNIQUE_EMAIL_MSG,
-                           NO_UNIQUE_INGR_MSG, NO_UNIQUE_NAME_MSG,
-                           NO_UNIQUE_TAG_MSG, TYPE_ERROR_MSG)
+from api.asynchronous import run_cpu_bound
+from api.cache import get_user_ids
+from api.constants import (BATCH_CONFLICT_MSG, BATCH_EMPTY_MSG,
+                           BATCH_MAX_RECIPES, ERROR_NAME_MSG,
+                           INVALID_IMAGE_MSG, MAX_SERVINGS,
+                           MIN_COOKING_TIME, MIN_INGR_ERR_MSG, MIN_INGR_MSG,
+                           MIN_SERVINGS, MIN_VALUE_MSG, NO_INGR_MSG,
+                           NO_TAG_MSG, NO_UNIQUE_EMAIL_MSG, NO_UNIQUE_INGR_MSG,
+                           NO_UNIQUE_NAME_MSG, NO_UNIQUE_TAG_MSG,
+                           REQUIRED_FIELD_MSG, TYPE_ERROR_MSG)
+from api.fields import ImageRenditionField, RecipeImageField
+from recipes.cart import apply_recipe_changes
+from recipes.images import create_renditions, delete_renditions
 from recipes.models import (Favorite, Ingredient, IngredientsForRecipe, Recipe,
-                            ShoppingList, Tag)
+                            ShoppingCartTotal, ShoppingList, Tag)
 from users.models import CustomUser, Follow
 
 
@@ -21,17 +30,32 @@ class CustomUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed')
+                  'last_name', 'is_subscribed', 'recipes_count',
+                  'followers_count')
+
+    def get_followed_ids(self, user):
+        """id авторов, на которых подписан пользователь. Берутся
+           из кеша и хранятся в общем контексте сериалайзеров,
+           в том числе вложенных и списочных.
+        """
+
+        followed_ids = self.context.get('followed_ids')
+        if followed_ids is None:
+            followed_ids = get_user_ids(user.pk, Follow)[0]
+            self.context['followed_ids'] = followed_ids
+        return followed_ids
 
     def get_is_subscribed(self, obj):
 
         request = self.context.get('request')
 
-        if request.user.is_anonymous or request is None:
+        if request is None or request.user.is_anonymous:
             return False
 
-        return Follow.objects.filter(user=request.user.id,
-                                     author=obj.id).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+
+        return obj.id in self.get_followed_ids(request.user)
 
 
 class RegSerializer(serializers.ModelSerializer):
@@ -67,12 +91,26 @@ class RegSerializer(serializers.ModelSerializer):
                   'last_name', 'password')
 
 
-class FollowRecipeSerializer(serializers.ModelSerializer):
+class ImageRenditionsMixin(serializers.Serializer):
+    """Ссылки на уменьшенные копии изображения рецепта."""
+
+    image_thumbnail = ImageRenditionField('thumbnail')
+    image_thumbnail_webp = ImageRenditionField('thumbnail_webp')
+    image_medium = ImageRenditionField('medium')
+    image_medium_webp = ImageRenditionField('medium_webp')
+
+    rendition_fields = ('image_thumbnail', 'image_thumbnail_webp',
+                        'image_medium', 'image_medium_webp')
+
+
+class FollowRecipeSerializer(ImageRenditionsMixin,
+                             serializers.ModelSerializer):
     """Сериалайзер для рецептов подписчика."""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time', )
+        fields = ('id', 'name', 'image', 'cooking_time',
+                  *ImageRenditionsMixin.rendition_fields)
 
 
 class FollowerSerializer(serializers.ModelSerializer):
@@ -85,7 +123,7 @@ class FollowerSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source='author.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = Follow
@@ -95,21 +133,23 @@ class FollowerSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
 
         request = self.context.get('request')
-        if request.user.is_anonymous or request is None:
+        if request is None or request.user.is_anonymous:
             return False
 
-        return Follow.objects.filter(user=request.user.id,
-                                     author=obj.author).exists()
+        return obj.user_id == request.user.id
 
     def get_recipes(self, obj):
 
-        recipes = Recipe.objects.filter(author=obj.author)
+        if hasattr(obj.author, 'limited_recipes'):
+            recipes = obj.author.limited_recipes
+        else:
+            recipes = Recipe.objects.filter(author=obj.author)
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
 
         return FollowRecipeSerializer(recipes, many=True).data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
-
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериалайзер для объектов модели Ingredient."""
@@ -135,12 +175,14 @@ class FavoriteSerializer(serializers.ModelSerializer):
         fields = ('id', 'user', 'recipe')
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(ImageRenditionsMixin,
+                            serializers.ModelSerializer):
     """Сериалайзер для короткого представления рецепта."""
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'cooking_time',
+                  *ImageRenditionsMixin.rendition_fields)
 
 
 class ShoppingListSerializer(serializers.ModelSerializer):
@@ -148,7 +190,58 @@ class ShoppingListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ShoppingList
-        fields = ('id', 'user', 'recipe')
+        fields = ('id', 'user', 'recipe', 'servings')
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """Сериалайзер пакетного добавления и удаления рецептов в списки."""
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=BATCH_MAX_RECIPES,
+        default=list,
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        max_length=BATCH_MAX_RECIPES,
+        default=list,
+    )
+
+    def validate(self, data):
+        data['add'] = list(dict.fromkeys(data['add']))
+        data['remove'] = list(dict.fromkeys(data['remove']))
+
+        if not data['add'] and not data['remove']:
+            raise serializers.ValidationError(BATCH_EMPTY_MSG)
+
+        conflicts = set(data['add']) & set(data['remove'])
+        if conflicts:
+            raise serializers.ValidationError(BATCH_CONFLICT_MSG.format(
+                ', '.join(map(str, sorted(conflicts)))))
+
+        return data
+
+
+class ShoppingListBatchSerializer(RecipeBatchSerializer):
+    """Пакетное изменение списка покупок с количеством порций
+       для добавляемых рецептов.
+    """
+
+    servings = serializers.IntegerField(
+        min_value=MIN_SERVINGS, max_value=MAX_SERVINGS, default=1)
+
+
+class ShoppingCartTotalSerializer(serializers.ModelSerializer):
+    """Сериалайзер для сумм ингредиентов в списке покупок."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit')
+
+    class Meta:
+        model = ShoppingCartTotal
+        fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
 class IngredientsForRecipeSerializer(serializers.ModelSerializer):
@@ -169,7 +262,7 @@ class IngredientsForRecipeSerializer(serializers.ModelSerializer):
         ]
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(ImageRenditionsMixin, serializers.ModelSerializer):
     """Сериалайзер для объектов модели Recipe."""
 
     ingredients = serializers.SerializerMethodField()
@@ -177,7 +270,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField()
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
@@ -185,23 +278,79 @@ class RecipeSerializer(serializers.ModelSerializer):
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
             'name', 'image', 'text', 'cooking_time',
+            'favorites_count', 'in_carts_count',
+            *ImageRenditionsMixin.rendition_fields,
         )
 
-    def create_update_method(self, recipe):
-        """Вспомогательная функция для добавления/обновления рецепта."""
+    def create_tags(self, recipe, tag_ids):
+        """Добавляет теги рецепту одним запросом."""
 
-        tags = self.initial_data.get('tags')
-        for tag in tags:
-            recipe.tags.add(get_object_or_404(Tag, pk=tag))
-        ingredients = self.initial_data.get('ingredients')
-        for ingredient in ingredients:
-            IngredientsForRecipe.objects.create(
-                ingredient_id=ingredient.get('id'),
-                recipe=recipe,
-                amount=ingredient.get('amount'),
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag_id=tag_id)
+            for tag_id in tag_ids
+        )
+
+    def create_ingredients(self, recipe, amounts):
+        """Добавляет ингредиенты рецепту одним запросом."""
+
+        IngredientsForRecipe.objects.bulk_create(
+            IngredientsForRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
             )
+            for ingredient_id, amount in amounts.items()
+        )
+
+    def update_ingredients(self, recipe, amounts):
+        """Изменяет только добавленные, удалённые и изменённые
+           ингредиенты рецепта и переносит изменения в списки покупок.
+        """
+
+        existing = {
+            item.ingredient_id: item
+            for item in IngredientsForRecipe.objects.filter(recipe=recipe)
+        }
+        deltas = {
+            ingredient_id: -item.amount
+            for ingredient_id, item in existing.items()
+        }
+        for ingredient_id, amount in amounts.items():
+            deltas[ingredient_id] = deltas.get(ingredient_id, 0) + amount
+
+        removed = existing.keys() - amounts.keys()
+        if removed:
+            IngredientsForRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            item = existing.get(ingredient_id)
+            if item is not None and item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            IngredientsForRecipe.objects.bulk_update(changed, ['amount'])
+
+        self.create_ingredients(recipe, {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        })
+
+        apply_recipe_changes(recipe.pk, deltas)
 
     def get_ingredients(self, obj):
+        if 'ingr_recipe' in getattr(obj, '_prefetched_objects_cache', {}):
+            return [
+                {
+                    'id': item.ingredient.id,
+                    'name': item.ingredient.name,
+                    'measurement_unit': item.ingredient.measurement_unit,
+                    'amount': item.amount,
+                }
+                for item in obj.ingr_recipe.all()
+            ]
+
         return obj.ingredient.values(
             'id', 'name', 'measurement_unit', amount=F('ingr_recipe__amount')
         )
@@ -212,6 +361,9 @@ class RecipeSerializer(serializers.ModelSerializer):
         if request.user.is_anonymous:
             return False
 
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+
         return Favorite.objects.filter(
             user=request.user, recipe=obj
         ).exists()
@@ -222,48 +374,122 @@ class RecipeSerializer(serializers.ModelSerializer):
         if request.user.is_anonymous:
             return False
 
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+
         return ShoppingList.objects.filter(
             user=request.user, recipe=obj
         ).exists()
 
+    def save_renditions(self, image):
+        """Создаёт уменьшенные копии изображения внутри транзакции:
+           изображение, которое не удалось декодировать целиком,
+           отклоняется вместе с рецептом.
+        """
+
+        try:
+            run_cpu_bound(create_renditions, image)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            delete_renditions(image.name)
+            image.delete(save=False)
+            raise serializers.ValidationError({'image': INVALID_IMAGE_MSG})
+
     def create(self, validated_data):
         author = self.context['request'].user
-        recipe = Recipe.objects.create(
-            author=author, **validated_data
-        )
-        self.create_update_method(recipe)
+        tag_ids = validated_data.pop('tags')
+        amounts = validated_data.pop('ingredients')
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                author=author, **validated_data
+            )
+            self.create_tags(recipe, tag_ids)
+            self.create_ingredients(recipe, amounts)
+            self.save_renditions(recipe.image)
         return recipe
 
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        instance.ingredient.clear()
-        self.create_update_method(instance)
-        return super().update(instance, validated_data)
-
-    def validate(self, data):
-        errors = []
-        if type(data['cooking_time']) is int:
-            if data['cooking_time'] < MIN_COOKING_TIME:
-                errors.append(MIN_VALUE_MSG)
-        else:
+        tag_ids = validated_data.pop('tags', None)
+        amounts = validated_data.pop('ingredients', None)
+        old_image = instance.image.name
+        with transaction.atomic():
+            if tag_ids is not None:
+                instance.tags.set(tag_ids)
+            if amounts is not None:
+                self.update_ingredients(instance, amounts)
+            instance = super().update(instance, validated_data)
+            if 'image' in validated_data:
+                self.save_renditions(instance.image)
+                if old_image and old_image != instance.image.name:
+                    transaction.on_commit(
+                        lambda: delete_renditions(old_image))
+        return instance
+
+    def validate_tag_ids(self, tags, errors):
+        """Проверяет теги одним запросом, возвращает список id."""
+
+        try:
+            tag_ids = [int(tag) for tag in tags]
+        except (TypeError, ValueError):
             errors.append(TYPE_ERROR_MSG)
+            return []
+
+        if len(set(tag_ids)) != len(tag_ids):
+            errors.append(NO_UNIQUE_TAG_MSG)
 
-        tags = self.initial_data.get('tags')
-        uniq_tag = [0]
-        for tag in tags:
-            if uniq_tag[-1] == tag:
-                errors.append(NO_UNIQUE_TAG_MSG)
-                break
-            uniq_tag.append(tag)
+        missing = set(tag_ids) - set(
+            Tag.objects.filter(pk__in=tag_ids).values_list('pk', flat=True)
+        )
+        if missing:
+            errors.append(NO_TAG_MSG.format(
+                ', '.join(map(str, sorted(missing)))))
+        return list(dict.fromkeys(tag_ids))
+
+    def validate_amounts(self, ingredients, errors):
+        """Проверяет ингредиенты одним запросом, возвращает словарь
+           {id ингредиента: количество}.
+        """
 
-        ingredients = self.initial_data.get('ingredients')
-        uniq_ingr = [0]
+        amounts = {}
         for ingredient in ingredients:
-            if int(ingredient['amount']) < MIN_INGR_MSG:
+            try:
+                ingredient_id = int(ingredient['id'])
+                amount = int(ingredient['amount'])
+            except (KeyError, TypeError, ValueError):
+                errors.append(TYPE_ERROR_MSG)
+                return {}
+            if amount < MIN_INGR_MSG:
                 errors.append(MIN_INGR_ERR_MSG)
-            if uniq_ingr[-1] == ingredient['id']:
+            if ingredient_id in amounts:
                 errors.append(NO_UNIQUE_INGR_MSG)
-            uniq_ingr.append(ingredient['id'])
+            amounts[ingredient_id] = amount
+
+        missing = amounts.keys() - set(
+            Ingredient.objects.filter(
+                pk__in=amounts.keys()
+            ).values_list('pk', flat=True)
+        )
+        if missing:
+            errors.append(NO_INGR_MSG.format(
+                ', '.join(map(str, sorted(missing)))))
+        return amounts
+
+    def validate(self, data):
+        errors = []
+        if 'cooking_time' in data or not self.partial:
+            if type(data.get('cooking_time')) is int:
+                if data['cooking_time'] < MIN_COOKING_TIME:
+                    errors.append(MIN_VALUE_MSG)
+            else:
+                errors.append(TYPE_ERROR_MSG)
+
+        for field, validate_field in (('tags', self.validate_tag_ids),
+                                      ('ingredients', self.validate_amounts)):
+            values = self.initial_data.get(field)
+            if values is None:
+                if not self.partial:
+                    errors.append(REQUIRED_FIELD_MSG.format(field))
+                continue
+            data[field] = validate_field(values, errors)
 
         if errors:
             raise serializers.ValidationError(errors)
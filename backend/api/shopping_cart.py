@@ -0,0 +1,154 @@
+import csv
+import os
+from datetime import datetime as dt
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.db.models import F
+from django.http import FileResponse, StreamingHttpResponse
+
+from api.asynchronous import run_cpu_bound
+from api.constants import (SHOPPING_CART_FILENAME, SHOPPING_CART_FONT,
+                           SHOPPING_CART_FONT_FILE)
+from recipes.models import ShoppingCartTotal
+
+PAGE_TOP = 800
+PAGE_BOTTOM = 50
+ITEMS_TOP = 750
+LINE_STEP = 25
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Регистрирует шрифт для PDF один раз на процесс.
+       reportlab импортируется лениво: он нужен только для PDF.
+    """
+
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont(
+        SHOPPING_CART_FONT,
+        os.path.join(settings.BASE_DIR, SHOPPING_CART_FONT_FILE),
+    ))
+
+
+def get_shopping_cart_ingredients(user):
+    """Суммы ингредиентов из списка покупок пользователя."""
+
+    return ShoppingCartTotal.objects.filter(user=user).values(
+        'ingredient_id', 'ingredient__name', 'ingredient__measurement_unit',
+        total=F('amount'),
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def get_title():
+    return f'Список покупок на {dt.today().strftime("%d.%m.%Y")}'
+
+
+def get_lines(ingredients):
+    for i, item in enumerate(ingredients.iterator(), 1):
+        yield (f'{i}. {item["ingredient__name"]} - {item["total"]}, '
+               f'{item["ingredient__measurement_unit"]}')
+
+
+def set_attachment(response, extension):
+    filename = quote(f'{SHOPPING_CART_FILENAME}.{extension}')
+    response['Content-Disposition'] = (
+        f"attachment; filename*=UTF-8''{filename}"
+    )
+    return response
+
+
+def draw_pdf(lines):
+    """Рисует PDF со списком покупок во временный буфер.
+       Длинный список переносится на новые страницы.
+    """
+
+    from reportlab.pdfgen import canvas
+
+    register_font()
+    buffer = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    page = canvas.Canvas(buffer)
+    page.setFont(SHOPPING_CART_FONT, size=20)
+    page.drawString(120, PAGE_TOP, get_title())
+    page.setFont(SHOPPING_CART_FONT, size=14)
+    height = ITEMS_TOP
+    for line in lines:
+        if height < PAGE_BOTTOM:
+            page.showPage()
+            page.setFont(SHOPPING_CART_FONT, size=14)
+            height = PAGE_TOP
+        page.drawString(75, height, line)
+        height -= LINE_STEP
+    page.showPage()
+    page.save()
+    buffer.seek(0)
+    return buffer
+
+
+def render_pdf(ingredients):
+    """PDF со списком покупок, отдаётся клиенту потоком из временного
+       буфера. Строки читаются из БД заранее, а отрисовка идёт
+       в ограниченном пуле потоков.
+    """
+
+    buffer = run_cpu_bound(draw_pdf, list(get_lines(ingredients)))
+    return set_attachment(
+        FileResponse(buffer, content_type='application/pdf'), 'pdf'
+    )
+
+
+def render_txt(ingredients):
+    """Текстовый список покупок, формируется построчно."""
+
+    def stream():
+        yield f'{get_title()}\n\n'
+        for line in get_lines(ingredients):
+            yield f'{line}\n'
+
+    return set_attachment(
+        StreamingHttpResponse(
+            stream(), content_type='text/plain; charset=utf-8'
+        ),
+        'txt',
+    )
+
+
+def render_csv(ingredients):
+    """CSV со списком покупок, формируется построчно."""
+
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for item in ingredients.iterator():
+            yield writer.writerow((
+                item['ingredient__name'],
+                item['ingredient__measurement_unit'],
+                item['total'],
+            ))
+
+    return set_attachment(
+        StreamingHttpResponse(
+            stream(), content_type='text/csv; charset=utf-8'
+        ),
+        'csv',
+    )
+
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'txt': render_txt,
+    'csv': render_csv,
+}
@@ -0,0 +1,104 @@
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_token
+from api.cache import bump_version, invalidate_recipe, invalidate_user_ids
+from api.search import ingredient_index, recipe_index
+from api.warmup import check_connections
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingList, Tag
+from users.models import CustomUser, Follow
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    """Сбрасывает индекс поиска ингредиентов при их изменении."""
+
+    ingredient_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_ingredients_version(**kwargs):
+    """Сбрасывает кеш ответов для ингредиентов."""
+
+    bump_version('ingredients')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def bump_tags_version(**kwargs):
+    """Сбрасывает кеш ответов для тегов."""
+
+    bump_version('tags')
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def bump_recipes_version(**kwargs):
+    """Сбрасывает кеш общих представлений рецептов: в них
+       встроены теги и ингредиенты.
+    """
+
+    bump_version('recipes')
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_cached_recipe(instance, **kwargs):
+    """Сбрасывает общее представление изменённого рецепта."""
+
+    invalidate_recipe(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=ShoppingList)
+@receiver([post_save, post_delete], sender=Follow)
+def invalidate_cached_user_ids(sender, instance, **kwargs):
+    """Сбрасывает закешированное избранное, список покупок
+       или подписки пользователя.
+    """
+
+    invalidate_user_ids(sender, instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_index(instance, **kwargs):
+    """Обновляет рецепт в индексе полнотекстового поиска."""
+
+    recipe_index.update(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_recipe_index(instance, **kwargs):
+    """Убирает удалённый рецепт из индекса полнотекстового поиска."""
+
+    recipe_index.remove(instance.pk)
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Проверяет постоянные соединения с БД перед запросом."""
+
+    check_connections()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Убирает токен из кеша аутентификации при выходе
+       или удалении пользователя.
+    """
+
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_tokens(instance, created, update_fields, **kwargs):
+    """Убирает токены пользователя из кеша аутентификации при смене
+       пароля, блокировке и других изменениях профиля.
+    """
+
+    if created or update_fields == frozenset(['last_login']):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+            'key', flat=True):
+        invalidate_token(key)
@@ -0,0 +1,54 @@
+from django.test import TestCase
+
+from recipes.models import (Favorite, Ingredient, IngredientsForRecipe, Recipe,
+                            ShoppingList, Tag)
+from users.models import CustomUser, Follow
+
+
+def create_recipes(count=12, image='recipes/images/dish.png'):
+    """Пользователи, теги, ингредиенты и рецепты для тестов API.
+
+    Рецепты поровну принадлежат трём авторам; читатель (reader)
+    подписан на первого автора, половина рецептов у него в избранном,
+    каждый третий - в списке покупок.
+    """
+
+    reader = CustomUser.objects.create_user(
+        username='reader', email='reader@example.com', password='pass')
+    authors = [
+        CustomUser.objects.create_user(
+            username=f'author{index}', email=f'author{index}@example.com',
+            password='pass', first_name=f'Имя{index}')
+        for index in range(3)
+    ]
+    tags = [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+            ('Ужин', '#8775D2', 'dinner'),
+        )
+    ]
+    ingredients = [
+        Ingredient.objects.create(name=f'ингредиент {index}',
+                                  measurement_unit='г')
+        for index in range(5)
+    ]
+    for index in range(count):
+        recipe = Recipe.objects.create(
+            author=authors[index % len(authors)], name=f'Рецепт {index}',
+            text='Описание', cooking_time=index + 1,
+            image=image if index % 2 else '')
+        recipe.tags.set(tags[:index % len(tags) + 1])
+        for position in range(3):
+            IngredientsForRecipe.objects.create(
+                recipe=recipe,
+                ingredient=ingredients[(index + position) % len(ingredients)],
+                amount=position + 1)
+        if index % 2:
+            Favorite.objects.create(user=reader, recipe=recipe)
+        if index % 3 == 0:
+            ShoppingList.objects.create(user=reader, recipe=recipe)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        Follow.objects.create(user=reader, author=authors[0])
+    return reader, authors
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.fixtures import create_recipes
+from recipes.models import (Favorite, Ingredient, IngredientsForRecipe, Recipe,
+                            ShoppingList)
+from recipes.paginators import ESTIMATE_THRESHOLD, EstimatedCountPaginator
+from users.models import CustomUser, Follow
+
+CHANGELISTS = (
+    '/admin/recipes/recipe/',
+    '/admin/recipes/shoppinglist/',
+    '/admin/recipes/favorite/',
+    '/admin/recipes/ingredientsforrecipe/',
+    '/admin/users/customuser/',
+    '/admin/users/follow/',
+)
+
+
+class AdminChangelistQueryCountTests(TestCase):
+    """Число запросов страниц списков админки не зависит
+       от числа строк: связанные объекты читаются через JOIN.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.authors = create_recipes(count=3)
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def count_queries(self, url):
+        return len(self.get_queries(url))
+
+    def add_rows(self):
+        ingredient = Ingredient.objects.first()
+        for index in range(6):
+            user = CustomUser.objects.create_user(
+                username=f'user{index}', email=f'user{index}@example.com',
+                password='pass')
+            recipe = Recipe.objects.create(
+                author=user, name=f'Ещё рецепт {index}', text='Описание',
+                cooking_time=5)
+            IngredientsForRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1)
+            Favorite.objects.create(user=user, recipe=recipe)
+            ShoppingList.objects.create(user=user, recipe=recipe)
+            Follow.objects.create(user=user, author=self.authors[0])
+
+    def test_queries_do_not_depend_on_rows(self):
+        before = {url: self.count_queries(url) for url in CHANGELISTS}
+        self.add_rows()
+        for url in CHANGELISTS:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+    def test_search_skips_full_count(self):
+        counts = [
+            sql for sql in self.get_queries('/admin/recipes/recipe/?q=Рецепт')
+            if 'COUNT(' in sql
+        ]
+        self.assertEqual(len(counts), 1)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Оценка количества строк вместо COUNT(*) для больших таблиц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(count=3)
+
+    def get_count(self, queryset, estimate):
+        paginator = EstimatedCountPaginator(queryset.order_by('pk'), 100)
+        with mock.patch.object(
+                EstimatedCountPaginator, 'get_estimate',
+                return_value=estimate):
+            return paginator.count
+
+    def test_large_table_uses_estimate(self):
+        estimate = ESTIMATE_THRESHOLD + 1
+        self.assertEqual(
+            self.get_count(Recipe.objects.all(), estimate), estimate)
+
+    def test_small_or_filtered_table_is_counted(self):
+        self.assertEqual(self.get_count(Recipe.objects.all(), 10), 3)
+        self.assertEqual(self.get_count(Recipe.objects.all(), None), 3)
+        self.assertEqual(self.get_count(
+            Recipe.objects.filter(cooking_time=1),
+            ESTIMATE_THRESHOLD + 1), 1)
+
+    def test_estimate_is_read_from_planner_statistics(self):
+        estimate = EstimatedCountPaginator(
+            Recipe.objects.order_by('pk'), 100).get_estimate()
+        if connection.vendor == 'postgresql':
+            self.assertIsInstance(estimate, int)
+        else:
+            self.assertIsNone(estimate)
@@ -0,0 +1,23 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from api.asynchronous import handler_state, run_cpu_bound
+
+
+def get_thread_name():
+    return threading.current_thread().name
+
+
+class RunCpuBoundTests(SimpleTestCase):
+    """Вынос тяжёлой работы в пул потоков только под ASGI."""
+
+    def test_direct_call_outside_asgi(self):
+        self.assertEqual(run_cpu_bound(get_thread_name), get_thread_name())
+
+    def test_pool_under_asgi_handler(self):
+        handler_state.asgi = True
+        try:
+            self.assertTrue(run_cpu_bound(get_thread_name).startswith('cpu'))
+        finally:
+            handler_state.asgi = False
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.authentication import token_cache
+from users.models import CustomUser
+
+
+class TokenAuthenticationTests(TestCase):
+    """Аутентификация по токену с кешем и без него."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            username='reader', email='reader@example.com', password='pass')
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_me(self):
+        return self.client.get('/api/users/me/').status_code
+
+    def check_revocation(self):
+        self.assertEqual(self.get_me(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(pk=self.token.pk).delete()
+        self.assertEqual(self.get_me(), 401)
+
+    def check_deactivation(self):
+        self.assertEqual(self.get_me(), 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get_me(), 401)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_revoked_without_shared_cache(self):
+        self.check_revocation()
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_deactivated_without_shared_cache(self):
+        self.check_deactivation()
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_cached_in_process_without_shared_cache(self):
+        self.assertEqual(self.get_me(), 200)
+        Token.objects.filter(pk=self.token.pk)._raw_delete('default')
+        self.assertEqual(self.get_me(), 200)
+        token_cache.clear()
+        self.assertEqual(self.get_me(), 401)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_revoked_with_shared_cache(self):
+        self.check_revocation()
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_deactivated_with_shared_cache(self):
+        self.check_deactivation()
+
+    def test_invalidated_after_commit(self):
+        self.assertEqual(self.get_me(), 200)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Token.objects.filter(pk=self.token.pk).delete()
+        self.assertEqual(len(token_cache.items), 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(token_cache.items), 0)
+        self.assertEqual(self.get_me(), 401)
+
+    def test_anonymous_me(self):
+        self.assertEqual(APIClient().get('/api/users/me/').status_code, 401)
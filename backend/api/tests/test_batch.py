@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from recipes.cart import get_recipe_amounts
+from recipes.models import Favorite, Recipe, ShoppingCartTotal, ShoppingList
+
+
+class RecipeBatchTests(TestCase):
+    """Пакетное изменение списков сохраняет счётчики и суммы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, _ = create_recipes(count=6)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assert_consistent(self):
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.favorites_count,
+                             Favorite.objects.filter(recipe=recipe).count())
+            self.assertEqual(
+                recipe.in_carts_count,
+                ShoppingList.objects.filter(recipe=recipe).count())
+
+        expected = {}
+        carts = ShoppingList.objects.filter(user=self.reader)
+        amounts = get_recipe_amounts(
+            carts.values_list('recipe_id', flat=True))
+        for cart in carts:
+            for ingredient_id, amount in amounts[cart.recipe_id].items():
+                expected[ingredient_id] = (expected.get(ingredient_id, 0)
+                                           + amount * cart.servings)
+        self.assertEqual(dict(ShoppingCartTotal.objects.filter(
+            user=self.reader).values_list('ingredient_id', 'amount')),
+            expected)
+
+    def test_shopping_cart_batch(self):
+        in_cart = set(ShoppingList.objects.filter(
+            user=self.reader).values_list('recipe_id', flat=True))
+        other = set(Recipe.objects.values_list('pk', flat=True)) - in_cart
+        response = self.client.post('/api/recipes/shopping_cart/batch/', {
+            'add': sorted(other | {min(in_cart)}), 'servings': 2,
+            'remove': sorted(in_cart - {min(in_cart)}),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        statuses = {item['id']: item['status']
+                    for item in response.data['results']}
+        self.assertEqual(len(set(statuses.values())), 3)
+        self.assert_consistent()
+
+        response = self.client.delete('/api/recipes/shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(ShoppingList.objects.filter(
+            user=self.reader).exists())
+        self.assert_consistent()
+
+    def test_favorite_batch(self):
+        favorites = set(Favorite.objects.filter(
+            user=self.reader).values_list('recipe_id', flat=True))
+        other = set(Recipe.objects.values_list('pk', flat=True)) - favorites
+        response = self.client.post('/api/recipes/favorite/batch/', {
+            'add': sorted(other), 'remove': sorted(favorites),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Favorite.objects.filter(
+            user=self.reader).values_list('recipe_id', flat=True)), other)
+        self.assert_consistent()
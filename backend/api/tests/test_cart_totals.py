@@ -0,0 +1,79 @@
+from django.test import TestCase
+
+from api.tests.fixtures import create_recipes
+from recipes.cart import get_recipe_amounts
+from recipes.models import (IngredientsForRecipe, ShoppingCartTotal,
+                            ShoppingList)
+from users.models import CustomUser
+
+
+class AdminCartTotalsTests(TestCase):
+    """Правки ингредиентов в админке обновляют суммы списков покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, _ = create_recipes(count=6)
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.recipe = ShoppingList.objects.filter(
+            user=cls.reader).first().recipe
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def get_totals(self):
+        return dict(ShoppingCartTotal.objects.filter(
+            user=self.reader).values_list('ingredient_id', 'amount'))
+
+    def get_expected(self):
+        totals = {}
+        carts = ShoppingList.objects.filter(user=self.reader)
+        amounts = get_recipe_amounts(
+            carts.values_list('recipe_id', flat=True))
+        for cart in carts:
+            for ingredient_id, amount in amounts[cart.recipe_id].items():
+                totals[ingredient_id] = (totals.get(ingredient_id, 0)
+                                         + amount * cart.servings)
+        return totals
+
+    def test_recipe_inline_change(self):
+        items = list(IngredientsForRecipe.objects.filter(
+            recipe=self.recipe).order_by('pk'))
+        data = {
+            'name': self.recipe.name, 'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'author': self.recipe.author_id,
+            'tags': list(self.recipe.tags.values_list('pk', flat=True)),
+            'ingr_recipe-TOTAL_FORMS': len(items),
+            'ingr_recipe-INITIAL_FORMS': len(items),
+            'ingr_recipe-MIN_NUM_FORMS': 0,
+            'ingr_recipe-MAX_NUM_FORMS': 1000,
+        }
+        for index, item in enumerate(items):
+            prefix = f'ingr_recipe-{index}-'
+            data.update({
+                prefix + 'id': item.pk, prefix + 'recipe': self.recipe.pk,
+                prefix + 'ingredient': item.ingredient_id,
+                prefix + 'amount': item.amount + 10,
+            })
+        data['ingr_recipe-0-DELETE'] = 'on'
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.pk}/change/', data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_totals(), self.get_expected())
+
+    def test_ingredient_admin_change_and_delete(self):
+        item = IngredientsForRecipe.objects.filter(recipe=self.recipe).first()
+        response = self.client.post(
+            f'/admin/recipes/ingredientsforrecipe/{item.pk}/change/', {
+                'recipe': item.recipe_id, 'ingredient': item.ingredient_id,
+                'amount': item.amount + 7,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_totals(), self.get_expected())
+
+        response = self.client.post(
+            f'/admin/recipes/ingredientsforrecipe/{item.pk}/delete/',
+            {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_totals(), self.get_expected())
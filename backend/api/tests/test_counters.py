@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from api.views import RecipeViewSet
+from recipes.counters import change_counter
+from recipes.models import Recipe
+from users.models import CustomUser
+
+
+class RecipeCounterTests(TestCase):
+    """Сохранение рецепта не затирает счётчики, изменённые параллельно."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.authors = create_recipes(count=3)
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+
+    def setUp(self):
+        cache.clear()
+        self.recipe = Recipe.objects.filter(author=self.authors[0]).first()
+        self.favorites_count = self.recipe.favorites_count
+
+    def increment_concurrently(self):
+        change_counter(Recipe.objects.filter(pk=self.recipe.pk),
+                       'favorites_count', 5)
+
+    def assert_counter_kept(self):
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count,
+                         self.favorites_count + 5)
+
+    def test_model_save(self):
+        self.increment_concurrently()
+        self.recipe.name = 'Новое название'
+        self.recipe.save()
+        self.assert_counter_kept()
+        self.assertEqual(self.recipe.name, 'Новое название')
+
+    def load_then_increment(self, get_object):
+        """Обёртка get_object: счётчик меняется после чтения рецепта,
+           как при параллельном добавлении в избранное.
+        """
+
+        def wrapper(*args, **kwargs):
+            recipe = get_object(*args, **kwargs)
+            self.increment_concurrently()
+            return recipe
+
+        return wrapper
+
+    def test_api_update(self):
+        client = APIClient()
+        client.force_authenticate(self.authors[0])
+        with mock.patch.object(
+                RecipeViewSet, 'get_object',
+                self.load_then_increment(RecipeViewSet.get_object)):
+            response = client.patch(
+                f'/api/recipes/{self.recipe.pk}/', {'name': 'Новое'},
+                format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_counter_kept()
+
+    def test_admin_change(self):
+        self.client.force_login(self.admin)
+        recipe_admin = admin.site._registry[Recipe]
+        data = {
+            'name': 'Новое', 'text': self.recipe.text,
+            'cooking_time': self.recipe.cooking_time,
+            'author': self.recipe.author_id,
+            'tags': list(self.recipe.tags.values_list('pk', flat=True)),
+            'ingr_recipe-TOTAL_FORMS': 0, 'ingr_recipe-INITIAL_FORMS': 0,
+            'ingr_recipe-MIN_NUM_FORMS': 0, 'ingr_recipe-MAX_NUM_FORMS': 1000,
+        }
+        with mock.patch.object(
+                recipe_admin, 'get_object',
+                self.load_then_increment(recipe_admin.get_object)):
+            response = self.client.post(
+                f'/admin/recipes/recipe/{self.recipe.pk}/change/', data)
+        self.assertEqual(response.status_code, 302)
+        self.assert_counter_kept()
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from api.db_routers import STICKY_COOKIE, is_sticky, make_sticky
+
+
+class StickyReadsTests(SimpleTestCase):
+    """Чтение с основной БД после записи."""
+
+    def get_request(self, response=None):
+        request = RequestFactory().get('/api/recipes/')
+        if response is not None:
+            request.COOKIES[STICKY_COOKIE] = (
+                response.cookies[STICKY_COOKIE].value)
+        return request
+
+    def test_sticky_after_write(self):
+        response = HttpResponse()
+        make_sticky(response)
+        self.assertTrue(is_sticky(self.get_request(response)))
+        self.assertFalse(is_sticky(self.get_request()))
+
+    def test_expired_and_forged_cookies_ignored(self):
+        response = HttpResponse()
+        make_sticky(response)
+        with mock.patch('django.core.signing.time.time',
+                        return_value=10 ** 10):
+            self.assertFalse(is_sticky(self.get_request(response)))
+
+        request = self.get_request()
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertFalse(is_sticky(request))
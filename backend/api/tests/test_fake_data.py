@@ -0,0 +1,25 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import FeedItem, Ingredient, Recipe
+from users.models import Follow
+
+
+class GenerateFakeDataTests(TestCase):
+    """Команда generate_fake_data собирает ленты подписок."""
+
+    def test_feeds_are_built(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        call_command('generate_fake_data', users=20, recipes=60, tags=2,
+                     follows=80, favorites=10, carts=10, stdout=StringIO())
+
+        expected = set(
+            Recipe.objects.filter(
+                author__following__isnull=False
+            ).values_list('author__following__user', 'id'))
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(expected)
+        self.assertEqual(
+            set(FeedItem.objects.values_list('user', 'recipe')), expected)
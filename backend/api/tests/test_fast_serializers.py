@@ -0,0 +1,116 @@
+import json
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.serializers import FollowerSerializer, RecipeSerializer
+from api.tests.fixtures import create_recipes
+from recipes.models import Recipe
+from users.models import Follow
+
+
+def dump(data):
+    """JSON с сохранением порядка ключей: сравнивается и он."""
+
+    return json.dumps(json.loads(JSONRenderer().render(data)),
+                      ensure_ascii=False, indent=1)
+
+
+class FastSerializerGoldenTests(TestCase):
+    """Быстрые сериалайзеры выдают то же, что и сериалайзеры DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.authors = create_recipes(count=9)
+        with cls.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=cls.reader, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+
+    def get_client(self, user):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def get_request(self, user, url):
+        request = Request(APIRequestFactory().get(url))
+        request.user = user or AnonymousUser()
+        return request
+
+    def get(self, user, url):
+        response = self.get_client(user).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def expected_recipes(self, user, url, ids):
+        recipes = Recipe.objects.in_bulk(ids)
+        return RecipeSerializer(
+            [recipes[pk] for pk in ids], many=True,
+            context={'request': self.get_request(user, url)}).data
+
+    def check_modes(self, check, anonymous=True):
+        users = (None, self.reader) if anonymous else (self.reader,)
+        for shared in (False, True):
+            for user in users:
+                with self.subTest(shared=shared, user=user):
+                    with override_settings(CACHE_IS_SHARED=shared):
+                        cache.clear()
+                        check(user)
+                        # Второй проход - из заполненного кеша.
+                        check(user)
+
+    def test_list(self):
+        url = '/api/recipes/?limit=9'
+
+        def check(user):
+            results = self.get(user, url)['results']
+            self.assertEqual(len(results), 9)
+            self.assertEqual(dump(results), dump(self.expected_recipes(
+                user, url, [recipe['id'] for recipe in results])))
+
+        self.check_modes(check)
+
+    def test_detail(self):
+        for recipe in Recipe.objects.filter(pk__in=(
+                Recipe.objects.exclude(image='').first().pk,
+                Recipe.objects.filter(image='').first().pk)):
+            url = f'/api/recipes/{recipe.pk}/'
+
+            def check(user):
+                self.assertEqual(
+                    dump(self.get(user, url)),
+                    dump(self.expected_recipes(user, url, [recipe.pk])[0]))
+
+            self.check_modes(check)
+
+    def test_feed(self):
+        url = '/api/recipes/feed/'
+
+        def check(user):
+            results = self.get(user, url)['results']
+            self.assertEqual(len(results), 6)
+            self.assertEqual(dump(results), dump(self.expected_recipes(
+                user, url, [recipe['id'] for recipe in results])))
+
+        self.check_modes(check, anonymous=False)
+
+    def test_subscriptions(self):
+        for limit in ('', '?recipes_limit=2'):
+            url = f'/api/users/subscriptions/{limit}'
+
+            def check(user):
+                results = self.get(user, url)['results']
+                follows = Follow.objects.filter(user=user).order_by('-id')
+                self.assertEqual(dump(results), dump(FollowerSerializer(
+                    follows, many=True, context={
+                        'request': self.get_request(user, url),
+                        'recipes_limit': 2 if limit else None,
+                    }).data))
+
+            self.check_modes(check, anonymous=False)
@@ -0,0 +1,113 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from recipes.feed import pull_celebrity_recipes, trim_feeds
+from recipes.models import FeedItem, Recipe
+from users.models import CustomUser, Follow
+
+
+class FeedTests(TestCase):
+    """Материализованная лента подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.authors = create_recipes(count=9)
+        cls.other = CustomUser.objects.create_user(
+            username='other', email='other@example.com', password='pass')
+
+    def feed(self, user=None):
+        return list(FeedItem.objects.filter(
+            user=user or self.reader
+        ).order_by('-pub_date', '-recipe').values_list('recipe', flat=True))
+
+    def recipes(self, *authors):
+        return list(Recipe.objects.filter(author__in=authors).order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+
+    def publish(self, author, name='Новый рецепт'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                author=author, name=name, text='Описание', cooking_time=5)
+
+    def follow(self, user, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=user, author=author)
+
+    def test_backfill_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Follow.objects.create(user=self.reader, author=self.authors[1])
+        self.assertEqual(self.feed(), self.recipes(self.authors[0]))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            self.feed(),
+            self.recipes(self.authors[0], self.authors[1]))
+
+    def test_prune(self):
+        self.follow(self.reader, self.authors[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.filter(
+                user=self.reader, author=self.authors[0]).delete()
+        self.assertEqual(self.feed(), self.recipes(self.authors[1]))
+
+    def test_fan_out(self):
+        self.follow(self.other, self.authors[1])
+        recipe = self.publish(self.authors[0])
+        self.assertEqual(self.feed()[0], recipe.pk)
+        self.assertNotIn(recipe.pk, self.feed(self.other))
+
+    @mock.patch('recipes.feed.FEED_TRIM_SLACK', 0)
+    @mock.patch('recipes.feed.FEED_MAX_ITEMS', 3)
+    def test_fan_out_trims_by_feed_size(self):
+        recipe = self.publish(self.authors[0])
+        self.assertEqual(
+            self.feed(), self.recipes(self.authors[0])[:3])
+        self.assertEqual(self.feed()[0], recipe.pk)
+
+    @mock.patch('recipes.feed.FEED_MAX_ITEMS', 2)
+    def test_trim_leaves_slack(self):
+        latest = self.recipes(self.authors[0])
+        trim_feeds([self.reader.pk], slack=1)
+        self.assertEqual(self.feed(), latest)
+
+        self.publish(self.authors[0])
+        trim_feeds([self.reader.pk], slack=1)
+        self.assertEqual(self.feed(), self.recipes(self.authors[0])[:2])
+
+    @mock.patch('recipes.feed.FEED_CELEBRITY_FOLLOWERS', 1)
+    def test_celebrity_recipes_are_pulled_on_read(self):
+        recipe = self.publish(CustomUser.objects.get(pk=self.authors[0].pk))
+        self.assertNotIn(recipe.pk, self.feed())
+
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        response = client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], recipe.pk)
+        self.assertEqual(self.feed(), self.recipes(self.authors[0]))
+
+    @mock.patch('recipes.feed.FEED_CELEBRITY_FOLLOWERS', 1)
+    def test_celebrity_pull_reads_only_missing_recipes(self):
+        self.follow(self.reader, self.authors[1])
+        with self.assertNumQueries(1):
+            pull_celebrity_recipes(self.reader)
+
+        recipe = self.publish(CustomUser.objects.get(pk=self.authors[1].pk))
+        self.assertNotIn(recipe.pk, self.feed())
+        pull_celebrity_recipes(self.reader)
+        self.assertEqual(self.feed()[0], recipe.pk)
+        with self.assertNumQueries(1):
+            pull_celebrity_recipes(self.reader)
+
+    @mock.patch('recipes.feed.FEED_CELEBRITY_FOLLOWERS', 1)
+    def test_celebrity_pull_skips_recipes_older_than_feed(self):
+        Recipe.objects.filter(author=self.authors[1]).update(
+            pub_date=Recipe.objects.order_by('pub_date')[0].pub_date)
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        with self.assertNumQueries(1):
+            pull_celebrity_recipes(self.reader)
+        self.assertEqual(self.feed(), self.recipes(self.authors[0]))
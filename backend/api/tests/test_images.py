@@ -0,0 +1,86 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.constants import IMAGE_RENDITIONS
+from recipes.images import get_rendition_name
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def encode_image(color='red', truncate=False):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), color).save(buffer, 'PNG')
+    data = buffer.getvalue()
+    if truncate:
+        data = data[:len(data) // 2]
+    return 'data:image/png;base64,' + base64.b64encode(data).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeImageTests(TestCase):
+    """Загрузка изображений рецептов и их уменьшенные копии."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def payload(self, **kwargs):
+        return {
+            'tags': [self.tag.pk],
+            'ingredients': [{'id': self.ingredient.pk, 'amount': 5}],
+            'name': 'Омлет', 'text': 'Описание', 'cooking_time': 10,
+            'image': encode_image(), **kwargs,
+        }
+
+    def assert_renditions(self, name, exist):
+        for rendition in IMAGE_RENDITIONS:
+            self.assertEqual(default_storage.exists(
+                get_rendition_name(name, rendition)), exist)
+
+    def test_corrupt_image_rejected(self):
+        response = self.client.post(
+            '/api/recipes/', self.payload(image=encode_image(truncate=True)),
+            format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_replaced_image_renditions_deleted(self):
+        response = self.client.post(
+            '/api/recipes/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get()
+        old_name = recipe.image.name
+        self.assert_renditions(old_name, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{recipe.pk}/',
+                self.payload(image=encode_image('blue')), format='json')
+        self.assertEqual(response.status_code, 200)
+        recipe.refresh_from_db()
+        self.assert_renditions(old_name, False)
+        self.assert_renditions(recipe.image.name, True)
@@ -0,0 +1,81 @@
+import io
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TransactionTestCase
+
+from downloaddb.management.commands.load_db import iter_json
+
+BEFORE_MERGE = [
+    ('recipes', '0002_recipe_recipe_author_pub_date_idx'),
+    ('users', '0002_follow_ordering_and_index'),
+]
+AFTER_MERGE = [('recipes', '0003_ingredient_name_unit_unique')]
+
+
+class IterJsonTests(SimpleTestCase):
+    """Потоковое чтение ингредиентов из JSON."""
+
+    def read(self, text):
+        return list(iter_json(io.StringIO(text)))
+
+    def test_reads_objects(self):
+        self.assertEqual(
+            self.read('[{"name": "соль", "measurement_unit": "г"}, {}]'),
+            [['соль', 'г'], [None, None]])
+
+    def test_rejects_non_object_items(self):
+        for text in ('[1]', '["соль"]', '[["соль", "г"]]', '[null]'):
+            with self.subTest(text=text):
+                with self.assertRaisesMessage(
+                        CommandError, 'Ожидается JSON-объект'):
+                    self.read(text)
+
+    def test_rejects_non_array(self):
+        with self.assertRaisesMessage(CommandError, 'Ожидается JSON-массив'):
+            self.read('{"name": "соль"}')
+
+
+class MergeDuplicateIngredientsTests(TransactionTestCase):
+    """Миграция объединяет дубли ингредиентов без потери количества."""
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(BEFORE_MERGE)
+        self.executor.loader.build_graph()
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_amounts_of_duplicates_are_summed(self):
+        apps = self.executor.loader.project_state(BEFORE_MERGE).apps
+        user_model = apps.get_model('users', 'CustomUser')
+        recipe_model = apps.get_model('recipes', 'Recipe')
+        ingredient_model = apps.get_model('recipes', 'Ingredient')
+        amount_model = apps.get_model('recipes', 'IngredientsForRecipe')
+        author = user_model.objects.create(
+            username='author', email='author@example.com')
+        both, duplicate_only = (
+            recipe_model.objects.create(
+                author=author, name=name, text='текст', cooking_time=5)
+            for name in ('оба', 'дубль'))
+        kept, extra = (
+            ingredient_model.objects.create(name='соль', measurement_unit='г')
+            for _ in range(2))
+        amount_model.objects.bulk_create([
+            amount_model(recipe=both, ingredient=kept, amount=5),
+            amount_model(recipe=both, ingredient=extra, amount=3),
+            amount_model(recipe=duplicate_only, ingredient=extra, amount=7),
+        ])
+
+        self.executor.migrate(AFTER_MERGE)
+
+        amounts = amount_model.objects.order_by('recipe_id').values_list(
+            'recipe_id', 'ingredient_id', 'amount')
+        self.assertEqual(
+            list(amounts),
+            [(both.pk, kept.pk, 8), (duplicate_only.pk, kept.pk, 7)])
+        self.assertFalse(
+            ingredient_model.objects.filter(pk=extra.pk).exists())
@@ -0,0 +1,67 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.cache import bump_version
+from api.constants import INGREDIENT_INDEX_CHECK_INTERVAL
+from api.search import ingredient_index
+from recipes.models import Ingredient
+
+
+class IngredientSearchTests(TestCase):
+    """Поиск ингредиентов по индексу в памяти процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('соль', 'сок лимонный', 'масло соевое', 'сахар'):
+            Ingredient.objects.create(name=name, measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+
+    def search(self, query):
+        response = APIClient().get('/api/ingredients/', {'name': query})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_matches_first(self):
+        self.assertEqual(
+            self.search('со'), ['сок лимонный', 'соль', 'масло соевое'])
+
+    def test_no_matches(self):
+        self.assertEqual(self.search('перец'), [])
+
+    def test_blank_query_returns_all(self):
+        for query in (' ', '\t', '\n', ' \t\n '):
+            with self.subTest(query=query):
+                self.assertEqual(len(self.search(query)), 4)
+                self.assertEqual(ingredient_index.search(query, 10), [])
+
+    def test_no_database_check_per_search(self):
+        self.search('со')
+        with self.assertNumQueries(1):
+            self.search('са')
+
+    def test_sees_rows_loaded_by_other_process(self):
+        self.search('со')
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='сода', measurement_unit='г')])
+        pk = Ingredient.objects.get(name='сода').pk
+        self.assertNotIn(pk, ingredient_index.search('сод', 10))
+
+        # load_db увеличивает версию справочника после загрузки.
+        bump_version('ingredients')
+        self.assertIn(pk, ingredient_index.search('сод', 10))
+
+    def test_local_cache_rechecks_database_periodically(self):
+        self.search('со')
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='сода', measurement_unit='г')])
+        pk = Ingredient.objects.get(name='сода').pk
+        later = time.monotonic() + INGREDIENT_INDEX_CHECK_INTERVAL
+        with mock.patch('api.search.time.monotonic', return_value=later):
+            self.assertIn(pk, ingredient_index.search('сод', 10))
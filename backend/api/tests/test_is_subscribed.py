@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from users.models import CustomUser, Follow
+
+USERS_URL = '/api/users/?limit=20'
+
+
+@override_settings(CACHE_IS_SHARED=False)
+class IsSubscribedTests(TestCase):
+    """is_subscribed в списке пользователей: подписки читателя
+       загружаются одним запросом на всю страницу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.authors = create_recipes(count=3)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def get_subscribed(self, client, url, queries):
+        with self.assertNumQueries(queries):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data.get('results', [response.data])
+        return {user['id']: user['is_subscribed'] for user in results}
+
+    def test_list(self):
+        expected = {user.pk: False for user in CustomUser.objects.all()}
+        expected[self.authors[0].pk] = True
+        self.assertEqual(
+            self.get_subscribed(self.client, USERS_URL, 3), expected)
+
+    def test_list_queries_do_not_depend_on_users(self):
+        for index in range(5):
+            author = CustomUser.objects.create_user(
+                username=f'user{index}', email=f'user{index}@example.com',
+                password='pass')
+            Follow.objects.create(user=self.reader, author=author)
+        subscribed = self.get_subscribed(self.client, USERS_URL, 3)
+        self.assertEqual(sum(subscribed.values()), 6)
+
+    def test_detail(self):
+        for author, expected in ((self.authors[0], True),
+                                 (self.authors[1], False)):
+            with self.subTest(author=author.username):
+                self.assertEqual(self.get_subscribed(
+                    self.client, f'/api/users/{author.pk}/', 2),
+                    {author.pk: expected})
+
+    def test_anonymous(self):
+        subscribed = self.get_subscribed(APIClient(), USERS_URL, 2)
+        self.assertFalse(any(subscribed.values()))
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_cached_follows_are_invalidated(self):
+        url = f'/api/users/{self.authors[1].pk}/'
+        self.assertEqual(self.get_subscribed(self.client, url, 2),
+                         {self.authors[1].pk: False})
+        self.assertEqual(self.get_subscribed(self.client, url, 1),
+                         {self.authors[1].pk: False})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_subscribed(self.client, url, 2),
+                         {self.authors[1].pk: True})
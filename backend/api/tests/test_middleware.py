@@ -0,0 +1,78 @@
+import re
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api.middleware import QueryStats, get_fingerprint, logger
+from api.tests.fixtures import create_recipes
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) duplicates", app;dur=[\d.]+')
+
+
+class QueryStatsTests(SimpleTestCase):
+    """Подсчёт запросов и повторов без connection.queries."""
+
+    def test_fingerprint_collapses_parameter_lists(self):
+        self.assertEqual(
+            get_fingerprint('SELECT 1 WHERE id IN (%s, %s, %s)'),
+            get_fingerprint('SELECT 1 WHERE id IN (%s,%s)'))
+
+    def test_duplicates_and_top(self):
+        stats = QueryStats()
+        execute = mock.Mock()
+        for sql in ('SELECT a WHERE id IN (%s, %s)', 'SELECT a',
+                    'SELECT a WHERE id IN (%s, %s, %s)', 'SELECT a',
+                    'SELECT b'):
+            stats(execute, sql, (), False, {})
+        self.assertEqual(stats.count, 5)
+        self.assertEqual(execute.call_count, 5)
+        self.assertEqual(stats.duplicates, 1)
+        self.assertEqual(stats.get_top(5), [
+            ('SELECT a WHERE id IN (...)', 2), ('SELECT a', 2)])
+
+
+@override_settings(
+    MIDDLEWARE=['api.middleware.QueryInstrumentationMiddleware',
+                *settings.MIDDLEWARE],
+    SLOW_REQUEST_QUERIES=1000, SLOW_REQUEST_MS=60000,
+)
+class QueryInstrumentationMiddlewareTests(TestCase):
+    """Заголовок Server-Timing и лог медленных запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, _ = create_recipes(count=6)
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        response = self.client.get(
+            url, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_server_timing_counts_queries(self):
+        with mock.patch.object(logger, 'warning') as warning:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get('/api/recipes/?limit=6')
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match)
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(int(match[1]), len(queries))
+        self.assertEqual(int(match[2]), 0)
+        warning.assert_not_called()
+
+    @override_settings(SLOW_REQUEST_QUERIES=1)
+    def test_slow_request_is_logged(self):
+        with self.assertLogs('api.sql', 'WARNING') as logs:
+            self.get('/api/recipes/')
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('GET /api/recipes/', logs.output[0])
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from recipes.models import Recipe
+
+
+class RecipeCursorPaginationTests(TestCase):
+    """Пагинация рецептов по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(count=12)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_pages_cover_all_recipes_once(self):
+        ids = []
+        url = '/api/recipes/?cursor=&limit=5'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True)))
+
+    def test_ordering_by_publication_date(self):
+        response = self.client.get(
+            '/api/recipes/', {'cursor': '', 'ordering': 'pub_date'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_counter_ordering_rejected(self):
+        for ordering in ('favorites_count', '-in_carts_count'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(
+                    '/api/recipes/', {'cursor': '', 'ordering': ordering})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.data)
+
+    def test_count_of_empty_search(self):
+        for ordering in ('pub_date', '-pub_date'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get('/api/recipes/', {
+                    'cursor': '', 'count': 1, 'search': 'zzzz',
+                    'ordering': ordering,
+                })
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], 0)
+                self.assertEqual(response.data['results'], [])
+
+    def test_counter_ordering_with_page_numbers(self):
+        response = self.client.get(
+            '/api/recipes/', {'ordering': 'favorites_count'})
+        self.assertEqual(response.status_code, 200)
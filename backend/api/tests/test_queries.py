@@ -0,0 +1,113 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from recipes.models import Recipe
+
+
+@override_settings(CACHE_IS_SHARED=False)
+class RecipeQueryCountTests(TestCase):
+    """Число запросов к БД при чтении рецептов не зависит
+       от размера страницы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, _ = create_recipes(count=12)
+        cls.recipe = Recipe.objects.order_by('-pub_date').first()
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assert_queries(self, client, url, expected):
+        with self.assertNumQueries(expected):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_anonymous(self):
+        for limit in (6, 12):
+            with self.subTest(limit=limit):
+                cache.clear()
+                response = self.assert_queries(
+                    self.anonymous, f'/api/recipes/?limit={limit}', 6)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_authenticated(self):
+        for limit in (6, 12):
+            with self.subTest(limit=limit):
+                cache.clear()
+                response = self.assert_queries(
+                    self.client, f'/api/recipes/?limit={limit}', 6)
+                self.assertEqual(len(response.data['results']), limit)
+
+    def test_detail_anonymous(self):
+        self.assert_queries(
+            self.anonymous, f'/api/recipes/{self.recipe.pk}/', 5)
+
+    def test_detail_authenticated(self):
+        self.assert_queries(
+            self.client, f'/api/recipes/{self.recipe.pk}/', 5)
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_list_authenticated_shared_cache(self):
+        url = '/api/recipes/?limit=12'
+        self.assert_queries(self.client, url, 9)
+        self.assert_queries(self.client, url, 2)
+
+
+class RecipeDefaultCacheQueryCountTests(TestCase):
+    """С настройками по умолчанию (один воркер, кеш в памяти процесса)
+       тела рецептов и списки пользователя берутся из кеша.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, _ = create_recipes(count=12)
+        cls.recipe = Recipe.objects.order_by('-pub_date').first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_warm_list_and_detail(self):
+        for url, expected in (('/api/recipes/?limit=12', 2),
+                              (f'/api/recipes/{self.recipe.pk}/', 1)):
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(expected):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class TagFilterQueryCountTests(TestCase):
+    """Словарь тегов для фильтра берётся из кеша, в том числе
+       из кеша в памяти единственного воркера.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        create_recipes(count=6)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_tag_map_cached(self):
+        url = '/api/recipes/?tags=breakfast&tags=lunch'
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_tag_map_not_cached_without_shared_cache(self):
+        url = '/api/recipes/?tags=breakfast&tags=lunch'
+        self.client.get(url)
+        with self.assertNumQueries(9):
+            self.client.get(url)
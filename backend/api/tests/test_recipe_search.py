@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.search import recipe_index
+from recipes.models import Recipe
+from users.models import CustomUser
+
+
+class RecipeSearchTests(TestCase):
+    """Полнотекстовый поиск рецептов: в PostgreSQL по поисковому
+       вектору, на других СУБД - по индексу в памяти процесса.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.recipes = {
+            key: Recipe.objects.create(
+                author=author, name=name, text=text, cooking_time=10)
+            for key, name, text in (
+                ('in_name', 'Тыквенный суп', 'Сварить тыкву.'),
+                ('in_text', 'Обед', 'Подать суп с гренками.'),
+                ('both_words', 'Суп с фрикадельками', 'Фрикадельки из фарша.'),
+                ('other', 'Блины', 'Испечь блины на молоке.'),
+            )
+        }
+
+    def setUp(self):
+        cache.clear()
+        recipe_index.invalidate()
+        self.client = APIClient()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            '/api/recipes/', {'search': query, 'limit': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def get_ids(self, *keys):
+        return [self.recipes[key].pk for key in keys]
+
+    def test_name_matches_rank_first(self):
+        ids = self.search('суп')
+        self.assertEqual(set(ids), set(self.get_ids(
+            'in_name', 'in_text', 'both_words')))
+        self.assertEqual(ids[-1], self.recipes['in_text'].pk)
+
+    def test_all_words_required(self):
+        self.assertEqual(self.search('суп фрикадельки'),
+                         self.get_ids('both_words'))
+
+    def test_word_forms(self):
+        self.assertEqual(self.search('блинами'), self.get_ids('other'))
+
+    def test_no_matches(self):
+        self.assertEqual(self.search('пицца'), [])
+
+    def test_explicit_ordering(self):
+        ids = self.search('суп', ordering='pub_date')
+        self.assertEqual(ids, self.get_ids('in_name', 'in_text',
+                                           'both_words'))
+
+    def test_index_follows_changes(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('Поисковый вектор обновляет триггер PostgreSQL.')
+        self.search('суп')
+        recipe = self.recipes['other']
+        recipe.name = 'Суп из блинов'
+        recipe.save()
+        self.assertIn(recipe.pk, self.search('суп'))
+        recipe.delete()
+        self.assertNotIn(recipe.pk, self.search('суп'))
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.tests.test_images import encode_image
+from recipes.models import Ingredient, IngredientsForRecipe, Recipe, Tag
+from users.models import CustomUser
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeWriteTests(TestCase):
+    """Запись рецепта: ингредиенты и теги пишутся пачками,
+       при изменении трогаются только отличающиеся строки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#E26C2D', 'breakfast'),
+                ('Обед', '#49B64E', 'lunch'),
+            )
+        ]
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'ингредиент {index}', measurement_unit='г')
+            for index in range(20)
+        ])
+        cls.ingredients = list(Ingredient.objects.order_by('pk'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def payload(self, ingredients, **kwargs):
+        return {
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient, amount in ingredients
+            ],
+            'name': 'Омлет', 'text': 'Описание', 'cooking_time': 10,
+            'image': encode_image(), **kwargs,
+        }
+
+    def create(self, ingredients):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/recipes/', self.payload(ingredients), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id'], len(queries)
+
+    def get_amounts(self, recipe_id):
+        return dict(IngredientsForRecipe.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', 'amount'))
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        _, few = self.create([(self.ingredients[0], 1)])
+        recipe_id, many = self.create(
+            [(ingredient, 2) for ingredient in self.ingredients])
+        self.assertEqual(few, many)
+        self.assertEqual(len(self.get_amounts(recipe_id)), 20)
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe_id).tags.count(), 2)
+
+    def test_update_changes_only_differences(self):
+        first, second, third, fourth = self.ingredients[:4]
+        recipe_id, _ = self.create([(first, 1), (second, 2), (third, 3)])
+        kept = IngredientsForRecipe.objects.get(
+            recipe_id=recipe_id, ingredient=first).pk
+
+        response = self.client.patch(f'/api/recipes/{recipe_id}/', {
+            'ingredients': [
+                {'id': first.pk, 'amount': 1},
+                {'id': second.pk, 'amount': 5},
+                {'id': fourth.pk, 'amount': 4},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.get_amounts(recipe_id),
+                         {first.pk: 1, second.pk: 5, fourth.pk: 4})
+        self.assertEqual(IngredientsForRecipe.objects.get(
+            recipe_id=recipe_id, ingredient=first).pk, kept)
+
+    def test_partial_update_keeps_ingredients_and_tags(self):
+        recipe_id, _ = self.create([(self.ingredients[0], 1)])
+        response = self.client.patch(
+            f'/api/recipes/{recipe_id}/', {'name': 'Каша'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.get_amounts(recipe_id),
+                         {self.ingredients[0].pk: 1})
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe_id).tags.count(), 2)
+
+    def test_invalid_ids_are_validation_errors(self):
+        first, second = self.ingredients[:2]
+        missing = self.ingredients[-1].pk + 1
+        for payload in (
+            self.payload([(first, 1), (second, 1), (first, 2)]),
+            self.payload([(first, 1)], tags=[self.tags[0].pk, 0]),
+            {**self.payload([(first, 1)]), 'ingredients': [
+                {'id': missing, 'amount': 1}]},
+        ):
+            with self.subTest(payload=payload['ingredients']):
+                response = self.client.post(
+                    '/api/recipes/', payload, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Tag
+
+
+class TagResponseCacheTests(TestCase):
+    """Кеш ответов и условные запросы для тегов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_conditional_get_and_invalidation(self):
+        response = self.client.get('/api/tags/')
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+            .status_code, 304)
+
+        self.tag.name = 'Поздний завтрак'
+        self.tag.save()
+        response = self.client.get('/api/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data[0]['name'], 'Поздний завтрак')
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_not_cached_without_shared_cache(self):
+        response = self.client.get('/api/tags/')
+        self.assertNotIn('ETag', response)
+
+        Tag.objects.filter(pk=self.tag.pk).update(name='Поздний завтрак')
+        response = self.client.get('/api/tags/')
+        self.assertEqual(response.data[0]['name'], 'Поздний завтрак')
+
+
+class IngredientResponseCacheTests(TestCase):
+    """Ответы для ингредиентов кешируются и в кеше одного процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_conditional_get_with_local_memory_cache(self):
+        self.assertIn('LocMemCache', settings.CACHES['default']['BACKEND'])
+        etag = self.client.get('/api/ingredients/')['ETag']
+        response = self.client.get(
+            '/api/ingredients/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
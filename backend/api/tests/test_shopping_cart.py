@@ -0,0 +1,84 @@
+from django.http import FileResponse, StreamingHttpResponse
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.shopping_cart import ITEMS_TOP, LINE_STEP, PAGE_BOTTOM, PAGE_TOP
+from recipes.models import Ingredient, IngredientsForRecipe, Recipe
+from users.models import CustomUser
+
+URL = '/api/recipes/download_shopping_cart/'
+FIRST_PAGE_LINES = (ITEMS_TOP - PAGE_BOTTOM) // LINE_STEP + 1
+PAGE_LINES = (PAGE_TOP - PAGE_BOTTOM) // LINE_STEP + 1
+
+
+class ShoppingCartDownloadTests(TestCase):
+    """Выгрузка списка покупок: суммы считаются в БД одним запросом,
+       длинный список занимает несколько страниц PDF.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.count = FIRST_PAGE_LINES + PAGE_LINES + 1
+        cls.reader = CustomUser.objects.create_user(
+            username='reader', email='reader@example.com', password='pass')
+        author = CustomUser.objects.create_user(
+            username='author', email='author@example.com', password='pass')
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'ингредиент {index:03}', measurement_unit='г')
+            for index in range(cls.count)
+        ])
+        ingredients = Ingredient.objects.all()
+        recipes = [
+            Recipe.objects.create(author=author, name=f'Рецепт {index}',
+                                  text='Описание', cooking_time=5)
+            for index in range(2)
+        ]
+        IngredientsForRecipe.objects.bulk_create([
+            IngredientsForRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=index + 1)
+            for index, recipe in enumerate(recipes)
+            for ingredient in ingredients
+        ])
+        for recipe in recipes:
+            recipe.shopping_list.create(user=cls.reader)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def download(self, file_type, queries=1):
+        with self.assertNumQueries(queries):
+            response = self.client.get(URL, {'file_type': file_type})
+            self.assertEqual(response.status_code, 200)
+            content = b''.join(response.streaming_content)
+        return response, content
+
+    def test_pdf_spans_several_pages(self):
+        response, content = self.download('pdf')
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(content.count(b'/Type /Page\n'), 3)
+
+    def test_empty_cart_pdf(self):
+        self.reader.shopping_list.all().delete()
+        _, content = self.download('pdf')
+        self.assertEqual(content.count(b'/Type /Page\n'), 1)
+
+    def test_txt_is_streamed_with_totals(self):
+        response, content = self.download('txt')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        lines = content.decode().splitlines()[2:]
+        self.assertEqual(len(lines), self.count)
+        self.assertEqual(lines[0], '1. ингредиент 000 - 3, г')
+
+    def test_csv_is_streamed_with_totals(self):
+        _, content = self.download('csv')
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0], 'name,measurement_unit,amount')
+        self.assertEqual(len(lines), self.count + 1)
+        self.assertEqual(lines[-1], f'ингредиент {self.count - 1:03},г,3')
+
+    def test_unknown_file_type(self):
+        response = self.client.get(URL, {'file_type': 'docx'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.fixtures import create_recipes
+from recipes.models import Recipe
+from users.models import CustomUser, Follow
+
+URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsTests(TestCase):
+    """Подписки: число запросов не зависит от числа авторов,
+       recipes_limit ограничивает рецепты каждого автора.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.authors = create_recipes(count=12)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def get(self, params=None, queries=None):
+        if queries is None:
+            response = self.client.get(URL, params)
+        else:
+            with self.assertNumQueries(queries):
+                response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def latest(self, author, limit=None):
+        return list(Recipe.objects.filter(author=author).order_by(
+            '-pub_date').values_list('id', flat=True)[:limit])
+
+    def test_queries_do_not_depend_on_follows(self):
+        self.get({'recipes_limit': 2}, queries=3)
+        for author in self.authors[1:]:
+            Follow.objects.create(user=self.reader, author=author)
+        self.assertEqual(
+            self.get({'recipes_limit': 2}, queries=3)['count'], 3)
+
+    def test_recipes_limit(self):
+        for author in self.authors[1:]:
+            Follow.objects.create(user=self.reader, author=author)
+        for limit, expected in (('2', 2), ('0', 0), ('-1', 0),
+                                ('abc', None), (None, None)):
+            with self.subTest(limit=limit):
+                params = {} if limit is None else {'recipes_limit': limit}
+                for result in self.get(params)['results']:
+                    self.assertEqual(
+                        [recipe['id'] for recipe in result['recipes']],
+                        self.latest(result['id'], expected))
+
+    def test_recipes_count_is_total(self):
+        results = self.get({'recipes_limit': 1})['results']
+        self.assertEqual(len(results[0]['recipes']), 1)
+        self.assertEqual(results[0]['recipes_count'], 4)
+        self.assertTrue(results[0]['is_subscribed'])
+
+    def test_subscribe_response(self):
+        author = CustomUser.objects.get(pk=self.authors[1].pk)
+        response = self.client.post(
+            f'/api/users/{author.pk}/subscribe/?recipes_limit=1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['recipes_count'], 4)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['recipes']],
+            self.latest(author, 1))
@@ -1,47 +1,108 @@
-from datetime import datetime as dt
-
 from django.contrib.auth.hashers import make_password
-from django.http.response import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Prefetch, Subquery
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from api.constants import (NO_RECIPE_MSG, NO_SUBSCIBE_MSG,
+from api.cache import CachedResponseMixin, invalidate_user_ids
+from api.constants import (BATCH_ADDED, BATCH_ALREADY_ADDED,
+                           BATCH_NOT_FOUND, BATCH_NOT_IN_LIST, BATCH_REMOVED,
+                           NO_RECIPE_MSG, NO_SUBSCIBE_MSG,
                            NO_UNIQUE_SUBSCRIBE_MSG, RECIPE_ADDED_MSG,
-                           RECIPE_DELETE_MSG, YOUSELF_SUBSCRIBE_DEL_MSG,
-                           YOUSELF_SUBSCRIBE_MSG)
-from api.filters import IngredientSearchFilter, RecipeFilter
-from api.paginators import PageNumberPaginationMod
+                           RECIPE_DELETE_MSG, RECIPES_LIMIT_PARAM,
+                           SHOPPING_CART_FILE_TYPE_MSG,
+                           SHOPPING_CART_FILE_TYPE_PARAM,
+                           YOUSELF_SUBSCRIBE_DEL_MSG, YOUSELF_SUBSCRIBE_MSG)
+from api.fast_serializers import (FollowerFastSerializer,
+                                  RecipeFastSerializer, follow_rows,
+                                  recipe_rows)
+from api.filters import (IngredientSearchFilter, RecipeFilter,
+                         RecipeOrderingFilter, RecipeSearchFilter)
+from api.paginators import (FeedPagination, FollowPagination,
+                            RecipePagination, UserPagination)
 from api.permissions import IsAdminOrReadOnly, IsAuthorOrStaff
 from api.serializers import (CustomUserSerializer, FavoriteSerializer,
                              FollowerSerializer, IngredientSerializer,
-                             RecipeSerializer, ShoppingListSerializer,
-                             ShortRecipeSerializer, TagSerializer)
+                             RecipeBatchSerializer, RecipeSerializer,
+                             ShoppingCartTotalSerializer,
+                             ShoppingListBatchSerializer,
+                             ShoppingListSerializer, ShortRecipeSerializer,
+                             TagSerializer)
+from api.shopping_cart import RENDERERS, get_shopping_cart_ingredients
+from recipes.bulk import add_recipes, lock_user_lists, remove_recipes
+from recipes.cart import change_servings
+from recipes.feed import pull_celebrity_recipes
 from recipes.models import (Favorite, Ingredient, IngredientsForRecipe, Recipe,
-                            ShoppingList, Tag)
+                            ShoppingCartTotal, ShoppingList, Tag)
 from users.models import CustomUser, Follow
 
 
 class SubsctiptionUserViewSet(UserViewSet):
     """Набор представлений для подписки."""
 
+    queryset = CustomUser.objects.order_by('id')
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = CustomUserSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = UserPagination
+
+    def get_instance(self):
+        """Текущий пользователь из БД: в объекте из кеша
+           аутентификации счётчики отложены и могут устареть.
+        """
+
+        if self.request.user.is_anonymous:
+            raise NotAuthenticated()
+        return CustomUser.objects.get(pk=self.request.user.pk)
 
     def perform_create(self, serializer):
         hash_pwd = make_password(serializer.validated_data.get('password'))
         serializer.save(password=hash_pwd)
 
+    def get_recipes_limit(self):
+        """Значение параметра recipes_limit или None, если не задано."""
+
+        try:
+            recipes_limit = int(
+                self.request.query_params[RECIPES_LIMIT_PARAM])
+        except (KeyError, ValueError):
+            return None
+        return max(recipes_limit, 0)
+
+    def get_author_recipes(self, recipes_limit):
+        """Рецепты авторов, не более recipes_limit последних
+           у каждого автора.
+        """
+
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).order_by('-pub_date').values('pk')[:recipes_limit]
+            ))
+        return recipes
+
+    def get_follow_queryset(self, recipes_limit):
+        """Подписки пользователя с количеством рецептов автора
+           и не более recipes_limit последними рецептами.
+        """
+
+        return Follow.objects.filter(
+            user=self.request.user
+        ).select_related('author').prefetch_related(
+            Prefetch('author__recipes',
+                     queryset=self.get_author_recipes(recipes_limit),
+                     to_attr='limited_recipes')
+        ).order_by('-id')
+
     @action(methods=['post'], detail=True,
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, id=None):
@@ -64,7 +125,8 @@ class SubsctiptionUserViewSet(UserViewSet):
             user=request.user, author=author
         )
         serializer = FollowerSerializer(
-            follow, context={'request': request}
+            follow, context={'request': request,
+                             'recipes_limit': self.get_recipes_limit()}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -90,28 +152,34 @@ class SubsctiptionUserViewSet(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(methods=['get'], detail=False,
-            permission_classes=[IsAuthenticated], url_path='subscriptions')
+            permission_classes=[IsAuthenticated], url_path='subscriptions',
+            pagination_class=FollowPagination)
     def subscriptions(self, request):
-        subscriptions = Follow.objects.filter(user=request.user)
+        recipes_limit = self.get_recipes_limit()
+        subscriptions = follow_rows(self.get_follow_queryset(recipes_limit))
         page = self.paginate_queryset(subscriptions)
-        serializer = FollowerSerializer(page, many=True,
-                                        context={'request': request})
+        serializer = FollowerFastSerializer(page, many=True, context={
+            'request': request,
+            'recipes': self.get_author_recipes(recipes_limit),
+        })
 
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """Набор представлений для операций с объектами модели Tag."""
 
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly, )
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """Набор представлений для операций с объектами модели Ingredient."""
 
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
@@ -125,14 +193,81 @@ class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrStaff, )
-    pagination_class = PageNumberPaginationMod
-    filter_backends = (DjangoFilterBackend, )
+    pagination_class = RecipePagination
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter,
+                       RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ('pub_date', 'favorites_count', 'in_carts_count')
+    ordering = ('-pub_date', '-id')
+
+    def get_queryset(self):
+        """Рецепты с автором, тегами и ингредиентами за фиксированное
+           число запросов. Флаги пользователя берутся из закешированных
+           списков пользователя; если кеш не общий для воркеров
+           (CACHE_IS_SHARED), флаги избранного, списка покупок
+           и подписки на автора вычисляются подзапросами.
+        """
+
+        queryset = Recipe.objects.select_related('author').defer(
+            'search_vector'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingr_recipe',
+                queryset=IngredientsForRecipe.objects.select_related(
+                    'ingredient').order_by('ingredient__name'),
+            ),
+        )
+        user = self.request.user
+
+        if user.is_anonymous or settings.CACHE_IS_SHARED:
+            return queryset
+
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            author_is_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author'))),
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Список рецептов: страница собирается быстрым сериалайзером
+           из словарей .values().
+        """
+
+        queryset = recipe_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        context = self.get_serializer_context()
+        if page is None:
+            return Response(RecipeFastSerializer(
+                queryset, many=True, context=context).data)
+        return self.get_paginated_response(RecipeFastSerializer(
+            page, many=True, context=context).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = get_object_or_404(
+            recipe_rows(self.get_queryset()), pk=kwargs[self.lookup_field])
+        self.check_object_permissions(request, recipe)
+        return Response(RecipeFastSerializer(
+            recipe, context=self.get_serializer_context()).data)
 
     def create_delete_method(self, models, save_serial, post_serial,
                              request, **kwargs):
         """Вспомогательная функция добавления/удаления рецептов в списки."""
 
+        with transaction.atomic():
+            lock_user_lists(self.request.user)
+            return self.change_list(models, save_serial, post_serial,
+                                    request, **kwargs)
+
+    def change_list(self, models, save_serial, post_serial, request,
+                    **kwargs):
+        """Добавляет рецепт в список или удаляет из него под блокировкой
+           списков пользователя.
+        """
+
         recipes_list = models.objects.filter(
             user=self.request.user, recipe=kwargs['recipe_id']
         ).exists()
@@ -167,14 +302,63 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(RECIPE_DELETE_MSG,
                             status=status.HTTP_204_NO_CONTENT)
 
+    def batch_method(self, models, batch_serial, request):
+        """Вспомогательная функция пакетного добавления и удаления
+           рецептов в списки. Возвращает результат для каждого id.
+        """
+
+        serializer = batch_serial(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        fields = {'servings': data['servings']} if 'servings' in data else {}
+        results = []
+
+        with transaction.atomic():
+            added, present = add_recipes(
+                models, request.user, data['add'], **fields)
+            if added:
+                invalidate_user_ids(models, request.user.pk)
+            removed = remove_recipes(models, request.user, data['remove'])
+
+        for recipe_id in data['add']:
+            if recipe_id in added:
+                result = BATCH_ADDED
+            elif recipe_id in present:
+                result = BATCH_ALREADY_ADDED
+            else:
+                result = BATCH_NOT_FOUND
+            results.append({'id': recipe_id, 'status': result})
+
+        for recipe_id in data['remove']:
+            results.append({
+                'id': recipe_id,
+                'status': (BATCH_REMOVED if recipe_id in removed
+                           else BATCH_NOT_IN_LIST),
+            })
+
+        return Response({'results': results})
+
     @action(
-        methods=['post', 'delete'],
+        methods=['post', 'patch', 'delete'],
         url_path='(?P<recipe_id>[0-9]+)/shopping_cart',
         detail=False,
         permission_classes=[IsAuthenticated],
     )
     def shopping_cart(self, request, **kwargs):
-        """Функция добавления и удаления рецепта в список покупок."""
+        """Функция добавления и удаления рецепта в список покупок.
+           PATCH меняет количество порций рецепта в списке.
+        """
+
+        if request.method == 'PATCH':
+            item = get_object_or_404(
+                ShoppingList, user=request.user, recipe=kwargs['recipe_id'])
+            serializer = ShoppingListSerializer(
+                item, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            change_servings(item, serializer.validated_data.get(
+                'servings', item.servings))
+
+            return Response(ShoppingListSerializer(item).data)
 
         return self.create_delete_method(
             ShoppingList,
@@ -201,41 +385,79 @@ class RecipeViewSet(viewsets.ModelViewSet):
             **kwargs
         )
 
+    @action(methods=['get'], detail=False,
+            permission_classes=[IsAuthenticated], filter_backends=(),
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь.
+           Читается из материализованной ленты по индексу
+           (пользователь, дата публикации).
+        """
+
+        pull_celebrity_recipes(request.user)
+        queryset = self.get_queryset().filter(
+            feed_items__user=request.user
+        ).annotate(
+            feed_pub_date=F('feed_items__pub_date')
+        ).order_by('-feed_pub_date', '-id')
+        page = self.paginate_queryset(recipe_rows(queryset))
+        serializer = RecipeFastSerializer(
+            page, many=True, context=self.get_serializer_context())
+
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'], detail=False, url_path='shopping_cart',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_summary(self, request):
+        """Суммы ингредиентов в списке покупок пользователя."""
+
+        totals = ShoppingCartTotal.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by(
+            'ingredient__name', 'ingredient__measurement_unit')
+        serializer = ShoppingCartTotalSerializer(totals, many=True)
+
+        return Response(serializer.data)
+
+    @shopping_cart_summary.mapping.delete
+    def clear_shopping_cart(self, request):
+        """Удаляет все рецепты из списка покупок."""
+
+        remove_recipes(ShoppingList, request.user)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=['post'], detail=False, url_path='shopping_cart/batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        """Добавляет и удаляет рецепты в списке покупок пачкой."""
+
+        return self.batch_method(
+            ShoppingList, ShoppingListBatchSerializer, request)
+
+    @action(methods=['post'], detail=False, url_path='favorite/batch',
+            permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        """Добавляет и удаляет рецепты в избранном пачкой."""
+
+        return self.batch_method(Favorite, RecipeBatchSerializer, request)
+
     @action(methods=['get'], detail=False,
             permission_classes=[IsAuthenticated])
     def download_shopping_cart(self, request):
-        """Функция формирования PDF-файла со списком покупок."""
-
-        shopping_list = {}
-        ingredients = IngredientsForRecipe.objects.filter(
-            recipe__shopping_list__user=request.user).values_list(
-            'ingredient__name', 'ingredient__measurement_unit',
-            'amount')
-        for item in ingredients:
-            name = item[0]
-            if name not in shopping_list:
-                shopping_list[name] = {
-                    'measurement_unit': item[1],
-                    'amount': item[2]
-                }
-            else:
-                shopping_list[name]['amount'] += item[2]
-        pdfmetrics.registerFont(
-            TTFont('Times', 'times.ttf', 'UTF-8'))
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="Список_покупок.pdf"')
-        page = canvas.Canvas(response)
-        page.setFont('Times', size=20)
-        page.drawString(120, 800,
-                        f'Список покупок на {dt.today().strftime("%d.%m.%Y")} '
-                        )
-        page.setFont('Times', size=14)
-        height = 750
-        for i, (name, data) in enumerate(shopping_list.items(), 1):
-            page.drawString(75, height, (f'{i}. {name} - {data["amount"]}, '
-                                         f'{data["measurement_unit"]}'))
-            height -= 25
-        page.showPage()
-        page.save()
-        return response
+        """Функция формирования файла со списком покупок.
+           Формат задаётся параметром file_type: pdf (по умолчанию),
+           txt или csv.
+        """
+
+        file_type = request.query_params.get(
+            SHOPPING_CART_FILE_TYPE_PARAM, 'pdf')
+
+        if file_type not in RENDERERS:
+            return Response({
+                'errors': SHOPPING_CART_FILE_TYPE_MSG.format(
+                    ', '.join(RENDERERS))
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return RENDERERS[file_type](
+            get_shopping_cart_ingredients(request.user))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.cache import close_caches
+from django.db import connection, connections
+
+from api.cache import get_tag_map
+from api.constants import CONN_HEALTH_CHECK_INTERVAL
+from api.search import ingredient_index, recipe_index
+from api.shopping_cart import register_font
+
+
+def warm_up():
+    """Загружает в память процесса всё, что иначе строится при первых
+       запросах: шрифт PDF, индексы поиска и словарь тегов.
+
+    Вызывается в мастере gunicorn до форка, поэтому в конце закрывает
+    соединения с БД и кешем: воркеры не должны делить сокеты мастера.
+    """
+
+    try:
+        register_font()
+        ingredient_index.warm_up()
+        if connection.vendor != 'postgresql':
+            recipe_index.warm_up()
+        get_tag_map()
+    finally:
+        connections.close_all()
+        close_caches()
+
+
+def open_connections():
+    """Открывает соединения со всеми БД заранее; при CONN_MAX_AGE > 0
+       первые запросы воркера используют их же.
+    """
+
+    for conn in connections.all():
+        conn.ensure_connection()
+
+
+def check_connections(**kwargs):
+    """Проверяет постоянные соединения не чаще раза
+       в CONN_HEALTH_CHECK_INTERVAL секунд и закрывает оборванные,
+       чтобы запрос открыл новое соединение вместо ошибки.
+    """
+
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        checked_at = getattr(conn, 'health_checked_at', None)
+        if checked_at is not None and (
+                now - checked_at < CONN_HEALTH_CHECK_INTERVAL):
+            continue
+        conn.health_checked_at = now
+        if not conn.is_usable():
+            conn.close()
@@ -0,0 +1,183 @@
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from itertools import cycle, islice
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from rest_framework.authtoken.models import Token
+
+from api.asynchronous import get_asgi_application
+from recipes.models import Recipe
+from users.models import CustomUser
+
+HANDLERS = ('wsgi', 'asgi')
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/{recipe_id}/',
+    '/api/tags/',
+    '/api/ingredients/?name=со',
+    '/api/recipes/shopping_cart/',
+    '/api/recipes/download_shopping_cart/',
+)
+
+
+def wsgi_request(application, path, headers):
+    """Выполняет GET-запрос к WSGI-приложению, возвращает статус."""
+
+    url = urlsplit(path)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': quote(url.query, safe='=&'),
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    statuses = []
+
+    def start_response(status, response_headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return statuses[0]
+
+
+async def asgi_request(application, path, headers):
+    """Выполняет GET-запрос к ASGI-приложению, возвращает статус."""
+
+    url = urlsplit(path)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url.path,
+        'raw_path': url.path.encode(),
+        'query_string': quote(url.query, safe='=&').encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')] + [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]['status']
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пропускной способности API под WSGI (синхронные '
+            'воркеры) и ASGI при конкурентной нагрузке. Запросы '
+            'выполняются в процессе, без сети.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--handler', choices=HANDLERS,
+                            help='Запустить только один режим.')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь запроса, можно указать несколько.')
+        parser.add_argument('--requests', default=300, type=int)
+        parser.add_argument('--concurrency', default=32, type=int,
+                            help='Одновременных клиентов.')
+        parser.add_argument('--workers', default=4, type=int,
+                            help='Синхронных воркеров WSGI.')
+        parser.add_argument('--user', help='Пользователь для токена; '
+                            'по умолчанию автор с наибольшим числом '
+                            'рецептов.')
+
+    def handle(self, *args, **options):
+        paths, headers = self.prepare(options)
+        handlers = [options['handler']] if options['handler'] else HANDLERS
+        for handler in handlers:
+            if handler == 'wsgi':
+                elapsed, results = self.run_wsgi(paths, headers, options)
+            else:
+                elapsed, results = asyncio.run(
+                    self.run_asgi(paths, headers, options))
+            self.report(handler, elapsed, results)
+
+    def prepare(self, options):
+        users = CustomUser.objects.order_by('-recipes_count')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        if user is None or recipe is None:
+            raise CommandError('Нет пользователей или рецептов: '
+                               'сначала выполните generate_fake_data.')
+
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+        paths = [
+            path.format(recipe_id=recipe.pk)
+            for path in options['paths'] or DEFAULT_PATHS
+        ]
+        return list(islice(cycle(paths), options['requests'])), headers
+
+    def run_wsgi(self, paths, headers, options):
+        application = get_wsgi_application()
+        workers = ThreadPoolExecutor(max_workers=options['workers'])
+
+        def timed(path):
+            # Клиент ждёт свободного воркера, как в очереди gunicorn.
+            start = time.perf_counter()
+            status = workers.submit(
+                wsgi_request, application, path, headers).result()
+            return status, time.perf_counter() - start
+
+        clients = ThreadPoolExecutor(max_workers=options['concurrency'])
+        start = time.perf_counter()
+        results = list(clients.map(timed, paths))
+        return time.perf_counter() - start, results
+
+    async def run_asgi(self, paths, headers, options):
+        application = get_asgi_application()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def timed(path):
+            async with semaphore:
+                start = time.perf_counter()
+                status = await asgi_request(application, path, headers)
+                return status, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(timed(path) for path in paths))
+        return time.perf_counter() - start, results
+
+    def report(self, handler, elapsed, results):
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(status >= 400 for status, _ in results)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{handler}: {len(results) / elapsed:.1f} запросов/с, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, '
+            f'p95 {p95 * 1000:.1f} мс, ошибок {errors}'
+        )
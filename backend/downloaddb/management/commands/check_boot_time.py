@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.constants import BOOT_IMPORT_BUDGET_MS, LAZY_MODULES
+
+BOOT_CODE = ('import django; django.setup(); '
+             'import foodgram.urls, foodgram.wsgi')
+
+
+def measure_imports():
+    """Время импорта модулей при загрузке приложения по данным
+       python -X importtime: {модуль: (собственное, суммарное)} в мс.
+    """
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+        stderr=subprocess.PIPE, universal_newlines=True,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr)
+
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(own) / 1000, int(cumulative) / 1000)
+        if not name[1:].startswith(' '):
+            total += int(cumulative) / 1000
+    return modules, total
+
+
+class Command(BaseCommand):
+    help = ('Проверка времени импорта при загрузке приложения: '
+            'суммарное время не больше BOOT_IMPORT_BUDGET_MS, '
+            'тяжёлые модули из LAZY_MODULES не импортируются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', default=BOOT_IMPORT_BUDGET_MS,
+                            type=int, help='Бюджет в мс.')
+        parser.add_argument('--top', default=10, type=int,
+                            help='Сколько самых медленных пакетов '
+                                 'показать.')
+
+    def handle(self, *args, **options):
+        modules, total = measure_imports()
+
+        packages = {}
+        for name, (own, _) in modules.items():
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + own
+        top = sorted(packages.items(), key=lambda item: -item[1])
+        for package, duration in top[:options['top']]:
+            self.stdout.write(f'{duration:8.1f} мс  {package}')
+        self.stdout.write(f'Всего: {total:.1f} мс, '
+                          f'бюджет {options["budget"]} мс.')
+
+        loaded = sorted(
+            module for module in LAZY_MODULES
+            if any(name == module or name.startswith(module + '.')
+                   for name in modules)
+        )
+        if loaded:
+            raise CommandError(
+                'При загрузке импортированы модули, которые должны '
+                f'импортироваться лениво: {", ".join(loaded)}.')
+        if total > options['budget']:
+            raise CommandError('Загрузка приложения превышает бюджет.')
+        self.stdout.write(self.style.SUCCESS('Время загрузки в норме.'))
@@ -0,0 +1,262 @@
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.cache import bump_version
+from recipes.cart import recount_totals
+from recipes.counters import recount
+from recipes.feed import rebuild_feed
+from recipes.models import (Favorite, Ingredient, IngredientsForRecipe, Recipe,
+                            ShoppingCartTotal, ShoppingList, Tag)
+from users.models import CustomUser, Follow
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+ZIPF_EXPONENT = 0.8
+
+
+def zipf_weights(size):
+    """Накопленные веса распределения Ципфа: первые элементы
+       выбираются намного чаще остальных.
+    """
+
+    return list(accumulate(1 / rank ** ZIPF_EXPONENT
+                           for rank in range(1, size + 1)))
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def explicit_pub_date():
+    """Позволяет задать pub_date при массовом создании рецептов."""
+
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = ('Генерация синтетических данных для нагрузочного '
+            'тестирования. Результат однозначно определяется --seed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=1000, type=int)
+        parser.add_argument('--recipes', default=10000, type=int)
+        parser.add_argument('--tags', default=10, type=int)
+        parser.add_argument('--ingredients-per-recipe', default=8, type=int,
+                            help='Среднее количество ингредиентов.')
+        parser.add_argument('--follows', default=20000, type=int)
+        parser.add_argument('--favorites', default=50000, type=int)
+        parser.add_argument('--carts', default=20000, type=int,
+                            help='Количество строк в списках покупок.')
+        parser.add_argument('--seed', default=0, type=int)
+        parser.add_argument('--batch-size', default=5000, type=int)
+
+    def bulk_create(self, model, objects, ignore_conflicts=False):
+        created = 0
+        for batch in batches(objects, self.batch_size):
+            model.objects.bulk_create(
+                batch, ignore_conflicts=ignore_conflicts)
+            created += len(batch)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {created}')
+        return created
+
+    def insert_rows(self, model, fields, rows, ignore_conflicts=False):
+        """Вставка кортежей многострочными INSERT без создания
+           экземпляров моделей: для таблиц на миллионы строк.
+        """
+
+        ops = connection.ops
+        columns = ', '.join(
+            ops.quote_name(model._meta.get_field(field).column)
+            for field in fields
+        )
+        placeholder = f'({", ".join(["%s"] * len(fields))})'
+        batch_size = min(self.batch_size,
+                         ops.bulk_batch_size(fields, [None]) or 1)
+        created = 0
+        with connection.cursor() as cursor:
+            for batch in batches(rows, batch_size):
+                cursor.execute(
+                    f'{ops.insert_statement(ignore_conflicts)} '
+                    f'{ops.quote_name(model._meta.db_table)} ({columns}) '
+                    f'VALUES {", ".join([placeholder] * len(batch))} '
+                    f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts)}',
+                    [value for row in batch for value in row]
+                )
+                created += len(batch)
+                if created % self.batch_size < batch_size:
+                    self.stdout.write(
+                        f'{model._meta.verbose_name_plural}: {created}')
+        return created
+
+    def pick(self, population, cum_weights):
+        return self.random.choices(population, cum_weights=cum_weights)[0]
+
+    def create_tags(self, count):
+        self.bulk_create(Tag, (
+            Tag(name=f'{self.prefix}tag_{i}',
+                slug=f'{self.prefix}tag_{i}',
+                color=f'#{self.random.randrange(0x1000000):06x}')
+            for i in range(count)
+        ), ignore_conflicts=True)
+        return list(Tag.objects.filter(
+            slug__startswith=f'{self.prefix}tag_'
+        ).values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password(self.prefix)
+        self.bulk_create(CustomUser, (
+            CustomUser(
+                username=f'{self.prefix}user_{i}',
+                email=f'{self.prefix}user_{i}@example.com',
+                first_name=f'Имя {i}',
+                last_name=f'Фамилия {i}',
+                password=password,
+            )
+            for i in range(count)
+        ))
+        return list(CustomUser.objects.filter(
+            username__startswith=f'{self.prefix}user_'
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, count, user_ids):
+        images = sorted(
+            name for name in os.listdir(settings.MEDIA_ROOT)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ) if os.path.isdir(settings.MEDIA_ROOT) else ['']
+        images = images or ['']
+        weights = zipf_weights(len(user_ids))
+        start = timezone.now() - timedelta(minutes=count)
+        with explicit_pub_date():
+            self.bulk_create(Recipe, (
+                Recipe(
+                    author_id=self.pick(user_ids, weights),
+                    name=f'{self.prefix}recipe_{i}',
+                    text=f'Описание рецепта {i}. ' * self.random.randint(
+                        1, 20),
+                    cooking_time=self.random.randint(5, 180),
+                    image=self.random.choice(images),
+                    pub_date=start + timedelta(minutes=i),
+                )
+                for i in range(count)
+            ))
+        return list(Recipe.objects.filter(
+            name__startswith=f'{self.prefix}recipe_'
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipe_relations(self, recipe_ids, tag_ids, ingredient_ids,
+                                mean_ingredients):
+        def recipe_tags():
+            for recipe_id in recipe_ids:
+                size = min(len(tag_ids), self.random.randint(1, 3))
+                for tag_id in self.random.sample(tag_ids, size):
+                    yield recipe_id, tag_id
+
+        def recipe_ingredients():
+            for recipe_id in recipe_ids:
+                size = round(self.random.gauss(
+                    mean_ingredients, mean_ingredients / 3))
+                size = min(len(ingredient_ids), max(1, size))
+                for ingredient_id in self.random.sample(ingredient_ids, size):
+                    yield recipe_id, ingredient_id, self.random.randint(1, 500)
+
+        self.insert_rows(Recipe.tags.through, ('recipe', 'tag'),
+                         recipe_tags())
+        self.insert_rows(IngredientsForRecipe,
+                         ('recipe', 'ingredient', 'amount'),
+                         recipe_ingredients())
+
+    def create_pairs(self, model, count, user_ids, targets, field,
+                     **defaults):
+        """Пары пользователь - объект: пользователи выбираются
+           по степенному закону (активные пользователи), объекты -
+           по популярности. Повторы пропускаются. Остальные поля
+           заполняются значениями из defaults.
+        """
+
+        user_weights = zipf_weights(len(user_ids))
+        target_weights = zipf_weights(len(targets))
+        shuffled_users = user_ids[:]
+        self.random.shuffle(shuffled_users)
+
+        def generate():
+            for _ in range(count):
+                user_id = self.pick(shuffled_users, user_weights)
+                target_id = self.pick(targets, target_weights)
+                if field == 'author' and user_id == target_id:
+                    continue
+                yield (user_id, target_id, *defaults.values())
+
+        self.insert_rows(model, ('user', field, *defaults), generate(),
+                         ignore_conflicts=True)
+
+    def rebuild_feeds(self):
+        """Собирает ленты подписок созданных пользователей: сигналы
+           подписок и рецептов при вставке пачками не срабатывают.
+        """
+
+        follower_ids = Follow.objects.filter(
+            user__username__startswith=f'{self.prefix}user_'
+        ).order_by('user_id').values_list('user_id', flat=True).distinct()
+        for user_id in follower_ids.iterator():
+            rebuild_feed(user_id)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.prefix = f'fake{options["seed"]}_'
+        self.batch_size = max(options['batch_size'], 1)
+
+        if CustomUser.objects.filter(
+                username__startswith=f'{self.prefix}user_').exists():
+            raise CommandError(
+                f'Данные для seed={options["seed"]} уже созданы.')
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Сначала загрузите ингредиенты: load_db.')
+
+        tag_ids = self.create_tags(options['tags'])
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(options['recipes'], user_ids)
+        self.create_recipe_relations(
+            recipe_ids, tag_ids, ingredient_ids,
+            options['ingredients_per_recipe'])
+
+        self.create_pairs(Follow, options['follows'], user_ids, user_ids,
+                          'author')
+        if recipe_ids:
+            popular = recipe_ids[:]
+            self.random.shuffle(popular)
+            self.create_pairs(Favorite, options['favorites'], user_ids,
+                              popular, 'recipe')
+            self.create_pairs(ShoppingList, options['carts'], user_ids,
+                              popular, 'recipe', servings=1)
+
+        recount(Recipe, CustomUser, Favorite, ShoppingList, Follow)
+        recount_totals(ShoppingCartTotal, ShoppingList)
+        self.rebuild_feeds()
+        bump_version('tags')
+        self.stdout.write(self.style.SUCCESS('Данные созданы.'))
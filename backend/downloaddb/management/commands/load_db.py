@@ -1,39 +1,122 @@
+import csv
 import json
 import os
+import re
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.db.utils import IntegrityError
 
+from api.cache import bump_version
 from recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ['name', 'measurement_unit']
+MAX_LENGTH = 200
+JSON_SEPARATOR = re.compile(r'[\s,]*')
+
+
+def iter_csv(file):
+    """Построчно читает пары (название, единица измерения) из CSV."""
+
+    for row in csv.reader(file):
+        if row == CSV_HEADER:
+            continue
+        yield row
+
+
+def iter_json(file):
+    """Потоково читает объекты из JSON-массива, не загружая файл
+       в память целиком.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив.')
+    position = 1
+    while True:
+        position = JSON_SEPARATOR.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON.')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if not isinstance(item, dict):
+            raise CommandError(f'Ожидается JSON-объект, получено: {item!r}')
+        yield [item.get('name'), item.get('measurement_unit')]
+
+
+READERS = {
+    '.csv': iter_csv,
+    '.json': iter_json,
+}
 
 
 class Command(BaseCommand):
-    help = 'Загрузка ингредиентов из файла CSV в базу данных.'
+    help = ('Загрузка ингредиентов из файла CSV или JSON в базу данных. '
+            'Повторный запуск не создаёт дублей.')
 
     def add_arguments(self, parser):
         parser.add_argument('filename', default='ingredients.json', nargs='?',
                             type=str)
+        parser.add_argument('--batch-size', default=1000, type=int,
+                            help='Количество строк в одном запросе.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Проверить файл без записи в базу.')
+
+    def get_rows(self, reader, file):
+        for line, row in enumerate(reader(file), 1):
+            if len(row) != 2 or not all(row):
+                self.stderr.write(f'Строка {line} пропущена: {row}')
+                continue
+            name, measurement_unit = (str(value).strip() for value in row)
+            if len(name) > MAX_LENGTH or len(measurement_unit) > MAX_LENGTH:
+                self.stderr.write(f'Строка {line} пропущена: {row}')
+                continue
+            yield Ingredient(name=name, measurement_unit=measurement_unit)
+
+    def save(self, batch, dry_run):
+        if not dry_run:
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
 
     def handle(self, *args, **options):
-        try:
-            with open(os.path.join(DATA_ROOT, options['filename']), 'r',
-                      encoding='utf-8') as f:
-                data = json.load(f)
-                ingredients = [
-                    Ingredient(
-                        name=ingredient.get('name'),
-                        measurement_unit=ingredient.get('measurement_unit')
-                    )
-                    for ingredient in data
-                ]
-
-                try:
-                    Ingredient.objects.bulk_create(ingredients)
-                except IntegrityError:
-                    print('Неуникальные элементы не добавлены.')
+        path = os.path.join(DATA_ROOT, options['filename'])
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError(
+                f'Поддерживаются файлы: {", ".join(READERS)}.')
+        batch_size = max(options['batch_size'], 1)
+        dry_run = options['dry_run']
+        count_before = Ingredient.objects.count()
 
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as file:
+                batch = []
+                processed = 0
+                for ingredient in self.get_rows(reader, file):
+                    batch.append(ingredient)
+                    if len(batch) >= batch_size:
+                        self.save(batch, dry_run)
+                        processed += len(batch)
+                        batch = []
+                        self.stdout.write(f'Обработано строк: {processed}')
+                self.save(batch, dry_run)
+                processed += len(batch)
         except FileNotFoundError:
             raise CommandError('Файл не найден!')
+
+        if dry_run:
+            self.stdout.write(f'Проверено строк: {processed}. '
+                              'Данные не записаны (--dry-run).')
+            return
+
+        bump_version('ingredients')
+        added = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed}, добавлено: {added}.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import create_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий изображений существующих рецептов.'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only('id', 'image')
+        created = 0
+        for recipe in recipes.iterator():
+            try:
+                create_renditions(recipe.image)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            created += 1
+        self.stdout.write(f'Обработано изображений: {created}.')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feed
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = ('Заполнение лент подписок по существующим подпискам, '
+            'например после массовой загрузки данных.')
+
+    def handle(self, *args, **options):
+        user_ids = Follow.objects.order_by('user_id').values_list(
+            'user_id', flat=True).distinct()
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            rebuild_feed(user_id)
+            rebuilt += 1
+        self.stdout.write(f'Собрано лент: {rebuilt}.')
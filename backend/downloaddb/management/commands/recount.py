@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cart import recount_totals
+from recipes.counters import recount
+from recipes.models import Favorite, Recipe, ShoppingCartTotal, ShoppingList
+from users.models import CustomUser, Follow
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт счётчиков избранного, списков покупок, рецептов, '
+            'подписчиков и сумм ингредиентов в списках покупок '
+            'по фактическим данным.')
+
+    def handle(self, *args, **options):
+        recount(Recipe, CustomUser, Favorite, ShoppingList, Follow)
+        recount_totals(ShoppingCartTotal, ShoppingList)
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -0,0 +1,17 @@
+"""
+ASGI config for foodgram project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are handled in worker threads, see api.asynchronous.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+
+from api.asynchronous import get_asgi_application  # noqa: E402
+
+application = get_asgi_application()
@@ -0,0 +1,51 @@
+"""Настройки gunicorn: gunicorn -c gunicorn.conf.py foodgram.asgi.
+
+Воркеры uvicorn обслуживают ASGI-приложение (api.asynchronous):
+запросы выполняются в потоках, а тяжёлая для процессора работа -
+в ограниченном пуле. Для WSGI-приложения foodgram.wsgi задайте
+GUNICORN_WORKER_CLASS=sync.
+
+Приложение загружается в мастере до форка (preload_app), там же
+выполняется прогрев (api.warmup), и воркеры получают готовые
+шрифт и индексы поиска. Каждый воркер после форка открывает
+свои соединения с БД.
+
+Несколько воркеров (GUNICORN_WORKERS) можно запустить только
+с общим кешем (CACHE_BACKEND, например memcached): кеш в памяти
+процесса не узнаёт об изменениях, сделанных в других воркерах.
+С одним воркером кеш в памяти процесса согласован и используется.
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS',
+                         'uvicorn.workers.UvicornWorker')
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+
+def on_starting(server):
+    from django.conf import settings
+
+    if (server.cfg.workers > 1 and settings.CACHES['default']['BACKEND']
+            in settings.PROCESS_LOCAL_CACHES):
+        raise RuntimeError(
+            f'Для {server.cfg.workers} воркеров нужен общий кеш: '
+            f'задайте CACHE_BACKEND (например, memcached) '
+            f'или GUNICORN_WORKERS=1.')
+
+
+def when_ready(server):
+    from api.warmup import warm_up
+
+    warm_up()
+    server.log.info('Прогрев приложения завершён.')
+
+
+def post_fork(server, worker):
+    from api.warmup import open_connections
+
+    open_connections()
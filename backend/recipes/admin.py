@@ -1,49 +1,100 @@
 from django.contrib import admin
 
+from .cart import apply_amount_changes, get_recipe_amounts
 from .models import (Favorite, Ingredient, IngredientsForRecipe, Recipe,
                      ShoppingList, Tag)
+from .paginators import EstimatedCountPaginator
 
 
-class IngredientAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Базовая админка для больших таблиц: без полного COUNT(*)
+       на каждой странице списка.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class IngredientAdmin(LargeTableAdmin):
     list_display = ('name', 'measurement_unit',)
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
 
 
 class IngredientForRecipeAdmin(admin.TabularInline):
     model = IngredientsForRecipe
     fk_name = 'recipe'
+    autocomplete_fields = ('ingredient',)
+    extra = 1
 
 
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('author', 'name', 'favorites', )
-    list_filter = ('author', 'name', 'tags')
-    search_fields = ('author',)
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ('name', 'author', 'favorites', 'pub_date')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author', 'tags')
     exclude = ('ingredients',)
     inlines = [IngredientForRecipeAdmin, ]
 
+    def save_related(self, request, form, formsets, change):
+        """Переносит правки ингредиентов в суммы списков покупок."""
+
+        recipe_ids = [form.instance.pk]
+        before = get_recipe_amounts(recipe_ids)
+        super().save_related(request, form, formsets, change)
+        apply_amount_changes(recipe_ids, before)
+
     def favorites(self, obj):
         """Получение количества добавлений рецепта в избранное."""
 
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     favorites.short_description = "Количество добавлений в избранное."
+    favorites.admin_order_field = 'favorites_count'
 
 
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'color', 'slug')
+    search_fields = ('name', 'slug')
 
 
-class ShoppingListAdmin(admin.ModelAdmin):
+class ShoppingListAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    ordering = ('-id',)
+    autocomplete_fields = ('user', 'recipe')
 
 
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    ordering = ('-id',)
+    autocomplete_fields = ('user', 'recipe')
 
 
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(LargeTableAdmin):
     list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        before = get_recipe_amounts(recipe_ids)
+        super().save_model(request, obj, form, change)
+        apply_amount_changes(recipe_ids, before)
+
+    def delete_model(self, request, obj):
+        recipe_ids = [obj.recipe_id]
+        before = get_recipe_amounts(recipe_ids)
+        super().delete_model(request, obj)
+        apply_amount_changes(recipe_ids, before)
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        before = get_recipe_amounts(recipe_ids)
+        super().delete_queryset(request, queryset)
+        apply_amount_changes(recipe_ids, before)
 
 
 admin.site.register(Ingredient, IngredientAdmin)
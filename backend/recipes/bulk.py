@@ -0,0 +1,68 @@
+from django.db import transaction
+
+from recipes.cart import add_recipes_to_totals
+from recipes.counters import change_counter
+from recipes.models import Recipe, ShoppingList
+from recipes.signals import RECIPE_COUNTERS
+from users.models import CustomUser
+
+
+def lock_user_lists(user):
+    """Блокирует до конца транзакции изменение избранного и списка
+       покупок пользователя: строки, найденные в списке после
+       блокировки, не появятся и не исчезнут в параллельном запросе.
+    """
+
+    CustomUser.objects.select_for_update().only('pk').get(pk=user.pk)
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids, **fields):
+    """Добавляет рецепты в избранное или список покупок пачкой.
+
+    bulk_create не вызывает сигналы, поэтому счётчики рецептов
+    и суммы списка покупок обновляются здесь, а кеш списка
+    пользователя сбрасывает вызывающий код. Чтобы не посчитать
+    дважды строки, добавленные параллельным запросом, списки
+    пользователя блокируются. Возвращает множества добавленных
+    рецептов и рецептов, которые уже были в списке.
+    """
+
+    lock_user_lists(user)
+    found = set(Recipe.objects.filter(
+        pk__in=recipe_ids).values_list('pk', flat=True))
+    present = set(model.objects.filter(
+        user=user, recipe_id__in=found
+    ).order_by().values_list('recipe_id', flat=True))
+    added = found - present
+    if not added:
+        return added, present
+
+    model.objects.bulk_create(
+        [model(user=user, recipe_id=recipe_id, **fields)
+         for recipe_id in added]
+    )
+    change_counter(Recipe.objects.filter(pk__in=added),
+                   RECIPE_COUNTERS[model], 1)
+    if model is ShoppingList:
+        add_recipes_to_totals(
+            user.pk, dict.fromkeys(added, fields.get('servings', 1)))
+    return added, present
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids=None):
+    """Удаляет рецепты из избранного или списка покупок; если
+       recipe_ids не задан - все рецепты. Счётчики, суммы списка
+       покупок и кеш обновляются сигналами удаления.
+       Возвращает множество удалённых рецептов.
+    """
+
+    lock_user_lists(user)
+    items = model.objects.filter(user=user).order_by()
+    if recipe_ids is not None:
+        items = items.filter(recipe_id__in=recipe_ids)
+    removed = set(items.values_list('recipe_id', flat=True))
+    if removed:
+        items.filter(recipe_id__in=removed).delete()
+    return removed
@@ -0,0 +1,162 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from api.constants import CART_BATCH_SIZE
+from recipes.models import (IngredientsForRecipe, ShoppingCartTotal,
+                            ShoppingList)
+
+
+def change_totals(changes):
+    """Изменяет суммы ингредиентов в списках покупок одним UPDATE.
+       changes - словарь {(id пользователя, id ингредиента): изменение}.
+       Строки с нулевой суммой удаляются.
+    """
+
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+
+    ShoppingCartTotal.objects.bulk_create(
+        [
+            ShoppingCartTotal(user_id=user_id, ingredient_id=ingredient_id)
+            for (user_id, ingredient_id), delta in changes.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+
+    groups = defaultdict(list)
+    for (user_id, ingredient_id), delta in changes.items():
+        groups[ingredient_id, delta].append(user_id)
+    totals = ShoppingCartTotal.objects.filter(
+        user_id__in={user_id for user_id, _ in changes},
+        ingredient_id__in={ingredient_id for _, ingredient_id in changes},
+    )
+    totals.update(amount=Greatest(
+        F('amount') + Case(
+            *(When(ingredient_id=ingredient_id, user_id__in=user_ids,
+                   then=Value(delta))
+              for (ingredient_id, delta), user_ids in groups.items()),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    ))
+    totals.filter(amount=0).delete()
+
+
+def get_amounts(recipe_id):
+    return IngredientsForRecipe.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient_id', 'amount')
+
+
+def add_recipes_to_totals(user_id, servings, sign=1):
+    """Добавляет к суммам пользователя (или вычитает при sign=-1)
+       ингредиенты рецептов. servings - словарь {id рецепта: порции}.
+    """
+
+    if not servings:
+        return
+
+    changes = defaultdict(int)
+    amounts = IngredientsForRecipe.objects.filter(
+        recipe_id__in=servings
+    ).values_list('recipe_id', 'ingredient_id', 'amount')
+    for recipe_id, ingredient_id, amount in amounts:
+        changes[user_id, ingredient_id] += (
+            sign * amount * servings[recipe_id])
+    change_totals(changes)
+
+
+def add_to_totals(item, sign=1):
+    """Добавляет к суммам (или вычитает при sign=-1) ингредиенты
+       рецепта из строки списка покупок с учётом количества порций.
+    """
+
+    add_recipes_to_totals(item.user_id, {item.recipe_id: item.servings},
+                          sign)
+
+
+@transaction.atomic
+def change_servings(item, servings):
+    """Меняет количество порций рецепта в списке покупок."""
+
+    change_totals({
+        (item.user_id, ingredient_id): amount * (servings - item.servings)
+        for ingredient_id, amount in get_amounts(item.recipe_id)
+    })
+    item.servings = servings
+    item.save(update_fields=['servings'])
+
+
+def apply_recipe_changes(recipe_id, deltas):
+    """Переносит изменения ингредиентов рецепта в списки покупок,
+       где он есть. deltas - словарь {id ингредиента: изменение}.
+    """
+
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    carts = ShoppingList.objects.filter(recipe_id=recipe_id).order_by(
+        'user_id').values_list('user_id', 'servings')
+    last_user_id = 0
+    while True:
+        batch = list(carts.filter(user_id__gt=last_user_id)[:CART_BATCH_SIZE])
+        if not batch:
+            break
+        change_totals({
+            (user_id, ingredient_id): delta * servings
+            for user_id, servings in batch
+            for ingredient_id, delta in deltas.items()
+        })
+        last_user_id = batch[-1][0]
+
+
+def get_recipe_amounts(recipe_ids):
+    """Ингредиенты рецептов: словарь {id рецепта: {id ингредиента:
+       количество}}. Повторяющиеся ингредиенты суммируются.
+    """
+
+    amounts = defaultdict(lambda: defaultdict(int))
+    rows = IngredientsForRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount')
+    for recipe_id, ingredient_id, amount in rows:
+        amounts[recipe_id][ingredient_id] += amount
+    return amounts
+
+
+def apply_amount_changes(recipe_ids, before):
+    """Переносит в списки покупок изменения ингредиентов рецептов,
+       сделанные в обход API (например, в админке). before - результат
+       get_recipe_amounts до изменений.
+    """
+
+    after = get_recipe_amounts(recipe_ids)
+    for recipe_id in recipe_ids:
+        deltas = defaultdict(int, after[recipe_id])
+        for ingredient_id, amount in before[recipe_id].items():
+            deltas[ingredient_id] -= amount
+        apply_recipe_changes(recipe_id, deltas)
+
+
+def recount_totals(total_model, shopping_list_model):
+    """Заново считает суммы ингредиентов во всех списках покупок."""
+
+    total_model.objects.all().delete()
+    totals = shopping_list_model.objects.order_by().values_list(
+        'user_id', 'recipe__ingr_recipe__ingredient_id'
+    ).annotate(
+        total=Sum(F('recipe__ingr_recipe__amount') * F('servings'))
+    )
+    total_model.objects.bulk_create(
+        (total_model(user_id=user_id, ingredient_id=ingredient_id,
+                     amount=total)
+         for user_id, ingredient_id, total in totals.iterator()
+         if ingredient_id is not None),
+        batch_size=CART_BATCH_SIZE,
+    )
@@ -0,0 +1,133 @@
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from api.constants import (FEED_CELEBRITY_FOLLOWERS, FEED_FANOUT_BATCH_SIZE,
+                           FEED_MAX_ITEMS, FEED_TRIM_SLACK)
+from recipes.models import FeedItem, Recipe
+from users.models import CustomUser, Follow
+
+
+def add_to_feeds(user_ids, recipes):
+    """Добавляет рецепты (id, id автора, дата) в ленты пользователей."""
+
+    FeedItem.objects.bulk_create(
+        [
+            FeedItem(user_id=user_id, recipe_id=recipe_id,
+                     author_id=author_id, pub_date=pub_date)
+            for user_id in user_ids
+            for recipe_id, author_id, pub_date in recipes
+        ],
+        batch_size=FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim_feeds(user_ids, slack=0):
+    """Оставляет в лентах пользователей не более FEED_MAX_ITEMS
+       последних рецептов. Ленты, превысившие лимит не больше чем
+       на slack рецептов, не обрезаются.
+    """
+
+    items = FeedItem.objects.filter(user=OuterRef('pk')).order_by(
+        '-pub_date', '-recipe').values('pub_date')
+    boundaries = CustomUser.objects.filter(pk__in=user_ids).annotate(
+        overflow=Subquery(
+            items[FEED_MAX_ITEMS + slack:FEED_MAX_ITEMS + slack + 1]),
+        boundary=Subquery(items[FEED_MAX_ITEMS - 1:FEED_MAX_ITEMS]),
+    ).filter(overflow__isnull=False).values_list('pk', 'boundary')
+    conditions = [
+        Q(user_id=user_id, pub_date__lt=boundary)
+        for user_id, boundary in boundaries
+    ]
+    if conditions:
+        FeedItem.objects.filter(reduce(or_, conditions)).delete()
+
+
+def is_celebrity(author):
+    return author.followers_count >= FEED_CELEBRITY_FOLLOWERS
+
+
+def fan_out(recipe):
+    """Рассылает новый рецепт в ленты подписчиков автора пачками.
+
+    Рецепты авторов с большим числом подписчиков не рассылаются,
+    а подтягиваются при чтении ленты (см. pull_celebrity_recipes).
+    Ленты обрезаются, когда вырастают на FEED_TRIM_SLACK рецептов
+    сверх лимита, чтобы не удалять по строке при каждой рассылке.
+    """
+
+    if is_celebrity(recipe.author):
+        return
+
+    followers = Follow.objects.filter(
+        author_id=recipe.author_id
+    ).order_by('user_id').values_list('user_id', flat=True)
+    recipes = [(recipe.pk, recipe.author_id, recipe.pub_date)]
+    last_user_id = 0
+
+    while True:
+        user_ids = list(followers.filter(
+            user_id__gt=last_user_id)[:FEED_FANOUT_BATCH_SIZE])
+        if not user_ids:
+            break
+        add_to_feeds(user_ids, recipes)
+        trim_feeds(user_ids, FEED_TRIM_SLACK)
+        last_user_id = user_ids[-1]
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты нового автора подписки."""
+
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('id', 'author_id', 'pub_date')[:FEED_MAX_ITEMS]
+    add_to_feeds([user_id], recipes)
+    trim_feeds([user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты рецепты автора после отписки."""
+
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def pull_celebrity_recipes(user):
+    """Подтягивает в ленту рецепты популярных авторов, вышедшие после
+       прошлого подтягивания.
+
+    Прошлым подтягиванием считается последний рецепт автора в ленте,
+    а если его там нет - самый старый рецепт ленты. Пока новых рецептов
+    нет, чтение ленты обходится одним запросом без записи.
+    """
+
+    feed = FeedItem.objects.filter(user=user).values('pub_date')
+    recipes = list(Recipe.objects.filter(
+        author__following__user=user,
+        author__followers_count__gte=FEED_CELEBRITY_FOLLOWERS,
+    ).annotate(pulled=Coalesce(
+        Subquery(feed.filter(
+            author=OuterRef('author')).order_by('-pub_date')[:1]),
+        Subquery(feed.order_by('pub_date')[:1]),
+    )).filter(
+        Q(pulled__isnull=True) | Q(pub_date__gt=F('pulled'))
+    ).order_by('-pub_date').values_list(
+        'id', 'author_id', 'pub_date')[:FEED_MAX_ITEMS])
+    if recipes:
+        add_to_feeds([user.pk], recipes)
+        trim_feeds([user.pk], FEED_TRIM_SLACK)
+
+
+@transaction.atomic
+def rebuild_feed(user_id):
+    """Заново собирает ленту пользователя по его подпискам."""
+
+    FeedItem.objects.filter(user_id=user_id).delete()
+    recipes = Recipe.objects.filter(
+        author__following__user_id=user_id
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'author_id', 'pub_date')[:FEED_MAX_ITEMS]
+    add_to_feeds([user_id], recipes)
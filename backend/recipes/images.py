@@ -0,0 +1,58 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from api.constants import IMAGE_RENDITIONS
+
+RENDITIONS_DIR = 'renditions'
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+
+def get_rendition_name(name, rendition):
+    """Имя файла производной версии изображения."""
+
+    stem = os.path.splitext(os.path.basename(name))[0]
+    extension = EXTENSIONS[IMAGE_RENDITIONS[rendition][1]]
+    return f'{RENDITIONS_DIR}/{stem}_{rendition}.{extension}'
+
+
+def delete_renditions(name, storage=default_storage):
+    """Удаляет уменьшенные копии изображения с заданным именем."""
+
+    for rendition in IMAGE_RENDITIONS:
+        storage.delete(get_rendition_name(name, rendition))
+
+
+def create_renditions(image, storage=default_storage):
+    """Создаёт уменьшенные копии изображения рецепта в JPEG и WebP."""
+
+    if not image:
+        return
+    image.open('rb')
+    try:
+        with Image.open(image) as source:
+            largest = max(size for size, _ in IMAGE_RENDITIONS.values())
+            source.draft('RGB', largest)
+            if source.mode in ('RGBA', 'LA', 'P'):
+                source = source.convert('RGBA')
+                background = Image.new('RGB', source.size, 'white')
+                background.paste(source, mask=source.getchannel('A'))
+                source = background
+            elif source.mode != 'RGB':
+                source = source.convert('RGB')
+
+            for rendition, (size, image_format) in sorted(
+                    IMAGE_RENDITIONS.items(),
+                    key=lambda item: item[1][0], reverse=True):
+                source.thumbnail(size)
+                buffer = BytesIO()
+                source.save(buffer, image_format, quality=85)
+                name = get_rendition_name(image.name, rendition)
+                if storage.exists(name):
+                    storage.delete(name)
+                storage.save(name, ContentFile(buffer.getvalue()))
+    finally:
+        image.close()
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:28
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Объединяет дубли ингредиентов перед добавлением ограничения."""
+
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientsForRecipe = apps.get_model('recipes', 'IngredientsForRecipe')
+
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep_id=Min('id'), total=Count('id')).filter(total__gt=1)
+
+    for group in duplicates.iterator():
+        extra_ids = list(Ingredient.objects.filter(
+            name=group['name'],
+            measurement_unit=group['measurement_unit'],
+        ).exclude(id=group['keep_id']).values_list('id', flat=True))
+        for item in IngredientsForRecipe.objects.filter(
+                ingredient_id__in=extra_ids).order_by('id'):
+            kept = IngredientsForRecipe.objects.filter(
+                ingredient_id=group['keep_id'], recipe_id=item.recipe_id)
+            if kept.update(amount=F('amount') + item.amount):
+                item.delete()
+            else:
+                item.ingredient_id = group['keep_id']
+                item.save(update_fields=['ingredient'])
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        # Отложенные проверки внешних ключей не дают изменить таблицу
+        # в той же транзакции.
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_recipe_recipe_author_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='ingredient_name_unit_unique'),
+        ),
+    ]
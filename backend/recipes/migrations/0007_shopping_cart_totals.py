@@ -0,0 +1,58 @@
+# Generated by Django 3.2.16 on 2026-10-17 07:21
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, Sum
+import django.db.models.deletion
+
+
+def fill_totals(apps, schema_editor):
+    ShoppingCartTotal = apps.get_model('recipes', 'ShoppingCartTotal')
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    totals = ShoppingList.objects.order_by().values_list(
+        'user_id', 'recipe__ingr_recipe__ingredient_id'
+    ).annotate(
+        total=Sum(F('recipe__ingr_recipe__amount') * F('servings'))
+    )
+    ShoppingCartTotal.objects.bulk_create(
+        (ShoppingCartTotal(user_id=user_id, ingredient_id=ingredient_id,
+                           amount=total)
+         for user_id, ingredient_id, total in totals.iterator()
+         if ingredient_id is not None),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_feed_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Во сколько раз увеличить количество ингредиентов', validators=[django.core.validators.MinValueValidator(1, message='Количество порций должно быть не меньше 1.'), django.core.validators.MaxValueValidator(100, message='Количество порций должно быть не больше 100.')], verbose_name='Количество порций'),
+        ),
+        migrations.CreateModel(
+            name='ShoppingCartTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_totals', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shopping_cart_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в списке покупок',
+                'verbose_name_plural': 'Ингредиенты в списках покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcarttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='shopping_cart_total_unique'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,17 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from api.constants import (MAX_COOK_TIME_VALUE, MAX_COOK_TIME_VALUE_MSG,
-                           MIN_COOK_TIME_VALUE, MIN_COOK_TIME_VALUE_MSG,
-                           STR_LENGHT)
+                           MAX_SERVINGS, MAX_SERVINGS_MSG, MIN_COOK_TIME_VALUE,
+                           MIN_COOK_TIME_VALUE_MSG, MIN_SERVINGS,
+                           MIN_SERVINGS_MSG, STR_LENGHT)
 from users.models import CustomUser
 
+# Счётчики рецепта, изменяемые только атомарными UPDATE.
+COUNTER_FIELDS = ('favorites_count', 'in_carts_count')
+
 
 class Tag(models.Model):
     """Класс для создания объектов модели Тэг."""
@@ -63,6 +68,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name', )
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='ingredient_name_unit_unique'
+            ),
+        ]
 
     def __str__(self):
         return self.name[:STR_LENGHT]
@@ -133,10 +144,48 @@ class Recipe(models.Model):
         db_index=True,
     )
 
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False,
+    )
+
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date', )
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='recipe_author_pub_date_idx'),
+            models.Index(fields=['-favorites_count', '-pub_date'],
+                         name='recipe_favorites_count_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Изменённый рецепт сохраняется без счётчиков: они меняются
+           атомарными UPDATE (recipes.counters), и запись значений,
+           прочитанных до сохранения, затёрла бы параллельные изменения.
+        """
+
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.get_deferred_fields() | set(COUNTER_FIELDS)
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name[:15]
@@ -228,6 +277,16 @@ class ShoppingList(models.Model):
         related_name='shopping_list',
     )
 
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        default=1,
+        validators=[
+            MinValueValidator(MIN_SERVINGS, message=MIN_SERVINGS_MSG),
+            MaxValueValidator(MAX_SERVINGS, message=MAX_SERVINGS_MSG),
+        ],
+        help_text='Во сколько раз увеличить количество ингредиентов',
+    )
+
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
@@ -237,3 +296,89 @@ class ShoppingList(models.Model):
             ),
         ]
         ordering = ('recipe__pub_date', )
+
+
+class ShoppingCartTotal(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя.
+
+    Обновляется при изменении списка покупок (см. recipes.cart).
+    """
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_cart_totals',
+        db_index=False,
+    )
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='shopping_cart_totals',
+    )
+
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='shopping_cart_total_unique'
+            ),
+        ]
+
+
+class FeedItem(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Строки добавляются при публикации рецепта и при подписке на автора
+    (см. recipes.feed), поэтому лента читается одним проходом по индексу.
+    """
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='feed_items',
+        db_index=False,
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='feed_items',
+    )
+
+    author = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        verbose_name='Автор рецепта',
+        related_name='+',
+    )
+
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='feed_item_user_recipe'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author', '-pub_date'],
+                         name='feed_user_author_idx'),
+        ]
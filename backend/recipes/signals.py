@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.cart import add_to_totals
+from recipes.counters import change_counter
+from recipes.feed import fan_out
+from recipes.models import Favorite, Recipe, ShoppingList
+from users.models import CustomUser
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingList: 'in_carts_count',
+}
+
+
+def update_recipe_counter(sender, instance, delta):
+    change_counter(Recipe.objects.filter(pk=instance.recipe_id),
+                   RECIPE_COUNTERS[sender], delta)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    """Увеличивает счётчик рецепта при добавлении в избранное
+       или список покупок.
+    """
+
+    if created:
+        update_recipe_counter(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingList)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """Уменьшает счётчик рецепта при удалении из избранного
+       или списка покупок.
+    """
+
+    update_recipe_counter(sender, instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик рецептов автора."""
+
+    if created:
+        change_counter(CustomUser.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    """Уменьшает счётчик рецептов автора."""
+
+    change_counter(CustomUser.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    """Добавляет новый рецепт в ленты подписчиков автора
+       после фиксации транзакции.
+    """
+
+    if created:
+        transaction.on_commit(lambda: fan_out(instance))
+
+
+@receiver(post_save, sender=ShoppingList)
+def add_to_cart_totals(sender, instance, created, **kwargs):
+    """Добавляет ингредиенты рецепта к суммам списка покупок."""
+
+    if created:
+        add_to_totals(instance)
+
+
+@receiver(pre_delete, sender=ShoppingList)
+def subtract_from_cart_totals(sender, instance, **kwargs):
+    """Вычитает ингредиенты рецепта из сумм списка покупок.
+       Вызывается до удаления, так как при удалении рецепта
+       его ингредиенты удаляются раньше строк списка покупок.
+    """
+
+    add_to_totals(instance, sign=-1)
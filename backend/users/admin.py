@@ -2,15 +2,24 @@ from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin
 
+from recipes.admin import LargeTableAdmin
 from users.models import Follow
 
 User = get_user_model()
 
 
-class CustomUserAdmin(UserAdmin):
-    list_display = ['email', 'username', ]
-    list_filter = ['email', 'username', ]
+class CustomUserAdmin(LargeTableAdmin, UserAdmin):
+    list_display = ['email', 'username', 'recipes_count', 'followers_count']
+    list_filter = ['role', 'is_staff', 'is_active']
+    search_fields = ['email', 'username']
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ['user', 'author']
+    list_select_related = ['user', 'author']
+    search_fields = ['user__username', 'author__username']
+    autocomplete_fields = ['user', 'author']
 
 
 admin.site.register(User, CustomUserAdmin)
-admin.site.register(Follow)
+admin.site.register(Follow, FollowAdmin)
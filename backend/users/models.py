@@ -49,6 +49,16 @@ class CustomUser(AbstractUser):
         choices=ROLE_CHOICES,
         default="user",
     )
+    recipes_count = models.PositiveIntegerField(
+        "Количество рецептов",
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        "Количество подписчиков",
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = "Пользователь"
@@ -80,8 +90,12 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        ordering = ('-id', )
         constraints = [
             models.UniqueConstraint(
                 fields=['author', 'user'], name='author_follow'
             ),
         ]
+        indexes = [
+            models.Index(fields=['user', '-id'], name='follow_user_id_idx'),
+        ]
@@ -0,0 +1,47 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.counters import change_counter
+from recipes.feed import backfill, prune
+from users.models import CustomUser, Follow
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик подписчиков автора."""
+
+    if created:
+        change_counter(CustomUser.objects.filter(pk=instance.author_id),
+                       'followers_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_count(sender, instance, **kwargs):
+    """Уменьшает счётчик подписчиков автора."""
+
+    change_counter(CustomUser.objects.filter(pk=instance.author_id),
+                   'followers_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    """Добавляет рецепты автора в ленту нового подписчика
+       после фиксации транзакции.
+    """
+
+    if created:
+        transaction.on_commit(
+            partial(backfill, instance.user_id, instance.author_id))
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты после отписки
+       и фиксации транзакции.
+    """
+
+    transaction.on_commit(
+        partial(prune, instance.user_id, instance.author_id))